@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from model_registry import registry
+from inference_backend import BACKENDS, load_model
+from compare_roi_inference import list_images
+from video_processing import VideoProcessing
+
+
+def board_plane_darts(vp, frame_rgb):
+    """Run one frame through inference, homography and board-plane transform. Returns (seconds, darts, segments)"""
+    start = time.perf_counter()
+    result = vp._infer(frame_rgb)[0]
+    elapsed = time.perf_counter() - start
+
+    calibration_coords, dart_coords = vp.predict.process_yolo_output(result)
+    if np.count_nonzero(calibration_coords == -1)/2 > 2 or len(dart_coords) == 0:
+        return elapsed, np.empty((0, 2)), []
+    crop_size = min(frame_rgb.shape[:2])
+    H_matrix = vp.predict.find_homography(calibration_coords, crop_size)
+    darts = np.asarray(vp.predict.transform_to_boardplane(H_matrix[0], dart_coords, crop_size)).reshape(-1, 2)
+    segments, _ = vp.predict.score(darts)
+    return elapsed, darts, sorted(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check an exported backend against the PyTorch model and compare latency")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--backend', default='onnx', choices=[b for b in BACKENDS if b != 'torch'])
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--images', default='training_data')
+    parser.add_argument('--tolerance', type=float, default=0.005, help="max board-plane distance between matched darts")
+    parser.add_argument('--min-agreement', type=float, default=0.95, help="fraction of images whose darts must match")
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = list_images(args.images) if os.path.isdir(args.images) else []
+    if not paths:
+        raise SystemExit(f"No images found in {args.images}")
+    warmup_frame = next((image for image in map(cv2.imread, paths) if image is not None), None)
+    if warmup_frame is None:
+        raise SystemExit(f"None of the images in {args.images} could be read")
+    warmup_frame = cv2.cvtColor(warmup_frame, cv2.COLOR_BGR2RGB)
+
+    predict = registry.get_scores(args.weights)
+    vps = {
+        'torch': VideoProcessing(args.weights, model=load_model(args.weights, 'torch'), predict=predict, headless=True, inference_mode='roi'),
+        args.backend: VideoProcessing(args.weights, model=load_model(args.weights, args.backend, args.int8, args.images), predict=predict, headless=True, inference_mode='roi'),
+    }
+    for vp in vps.values():
+        for _ in range(args.warmup):
+            board_plane_darts(vp, warmup_frame)
+
+    timings = {name: [] for name in vps}
+    agree, segment_agree, errors, failures = 0, 0, [], []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t_ref, darts_ref, segments_ref = board_plane_darts(vps['torch'], frame_rgb)
+        t_new, darts_new, segments_new = board_plane_darts(vps[args.backend], frame_rgb)
+        timings['torch'].append(t_ref)
+        timings[args.backend].append(t_new)
+
+        matched = len(darts_ref) == len(darts_new)
+        if matched and len(darts_ref):
+            distances = np.linalg.norm(darts_ref[:, None, :] - darts_new[None, :, :], axis=2).min(axis=1)
+            errors.extend(distances)
+            matched = bool(np.all(distances <= args.tolerance))
+        agree += matched
+        segment_agree += segments_ref == segments_new
+        if not matched:
+            failures.append(path)
+
+    n = len(timings['torch'])
+    name = f"{args.backend}{' int8' if args.int8 else ''}"
+    print(f"Images: {n}")
+    for backend, label in (('torch', 'torch'), (args.backend, name)):
+        t = np.array(timings[backend]) * 1000
+        print(f"{label:<14} mean {t.mean():7.1f} ms  p50 {np.percentile(t, 50):7.1f} ms  p95 {np.percentile(t, 95):7.1f} ms")
+    print(f"Speed-up: {np.mean(timings['torch']) / np.mean(timings[args.backend]):.2f}x")
+    print(f"Dart coordinate agreement (<= {args.tolerance}): {100 * agree / n:.1f}%")
+    print(f"Scored segment agreement: {100 * segment_agree / n:.1f}%")
+    if errors:
+        print(f"Board-plane error: mean {np.mean(errors):.4f}, max {np.max(errors):.4f}")
+    for path in failures[:10]:
+        print(f"  mismatch: {path}")
+
+    if agree / n < args.min_agreement:
+        print(f"FAIL: {name} does not match the PyTorch model")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from capture import CameraSource, JpegDecoder, MJPEGCameraSource
+from compare_roi_inference import list_images
+from inference_backend import _letterbox
+
+
+def to_tensor(frame_rgb, imgsz, inference_mode='full'):
+    """The model input ultralytics builds from a frame: letterboxed (or ROI-cropped) to imgsz, NCHW float32 in [0, 1]"""
+    if inference_mode == 'roi':
+        h, w = frame_rgb.shape[:2]
+        size = min(h, w)
+        y0, x0 = (h - size) // 2, (w - size) // 2
+        image = cv2.resize(frame_rgb[y0:y0 + size, x0:x0 + size], (imgsz, imgsz), interpolation=cv2.INTER_AREA)
+    else:
+        image = _letterbox(frame_rgb, imgsz)
+    return np.ascontiguousarray(image.transpose(2, 0, 1))[None].astype(np.float32) / 255
+
+
+def summarise(samples):
+    samples = np.array(samples)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {'count': len(samples), 'mean_ms': float(samples.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def encode_frames(paths, resolution, quality):
+    """Training images stretched to the camera resolution and JPEG encoded, standing in for what an MJPEG camera sends"""
+    height, width = resolution
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+        frames.append(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].reshape(-1))
+    return frames
+
+
+def offline_paths(args, min_sides):
+    """Capture-to-tensor functions for one encoded frame, keyed by name"""
+    def opencv_full(data):
+        # the current path when the camera sends MJPEG: OpenCV decodes to full-size BGR, then cvtColor
+        return to_tensor(cv2.cvtColor(cv2.imdecode(data, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB), args.imgsz, args.inference_mode)
+
+    def scaled(decoder):
+        return lambda data: to_tensor(decoder.decode(data), args.imgsz, args.inference_mode)
+
+    paths = {'opencv_full': opencv_full}
+    opencv_decoder = JpegDecoder(*min_sides, use_turbojpeg=False)
+    paths['mjpeg_opencv_scaled'] = scaled(opencv_decoder)
+    turbo_decoder = JpegDecoder(*min_sides)
+    if turbo_decoder.backend == 'turbojpeg':
+        paths['mjpeg_turbojpeg_scaled'] = scaled(turbo_decoder)
+    else:
+        print("PyTurboJPEG not available, skipping the turbojpeg path")
+    return paths, opencv_decoder
+
+
+def run_offline(args, min_sides):
+    frames = encode_frames(list_images(args.images)[:args.limit], (args.height, args.width), args.quality)
+    if not frames:
+        raise SystemExit(f"No images found in {args.images}")
+    paths, decoder = offline_paths(args, min_sides)
+
+    # frames already decoded to BGR before timing: the host-side work left over from the current path when the
+    # driver delivers raw frames (its YUYV->BGR conversion happens inside cap.read() and isn't included)
+    decoded = [cv2.imdecode(data, cv2.IMREAD_COLOR) for data in frames]
+    results = {'raw_bgr_predecoded': []}
+    for _ in range(args.warmup):
+        to_tensor(cv2.cvtColor(decoded[0], cv2.COLOR_BGR2RGB), args.imgsz, args.inference_mode)
+    for frame in decoded * args.repeat:
+        start = time.perf_counter()
+        to_tensor(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), args.imgsz, args.inference_mode)
+        results['raw_bgr_predecoded'].append((time.perf_counter() - start) * 1000)
+
+    for name, path in paths.items():
+        for _ in range(args.warmup):
+            path(frames[0])
+        results[name] = []
+        for data in frames * args.repeat:
+            start = time.perf_counter()
+            path(data)
+            results[name].append((time.perf_counter() - start) * 1000)
+
+    info = {'frames': len(frames), 'frame_size': [args.height, args.width], 'mean_jpeg_kb': float(np.mean([len(data) for data in frames]) / 1024),
+            'decoded_size': list(decoder.decode(frames[0]).shape[:2]), 'scale': f"1/{decoder.denominator}"}
+    return {name: summarise(samples) for name, samples in results.items()}, info
+
+
+def run_live(args, min_sides):
+    sources = {
+        'camera_raw': CameraSource(args.camera, (args.height, args.width), args.fps),
+        'camera_mjpeg': MJPEGCameraSource(args.camera, (args.height, args.width), args.fps, min_long_side=min_sides[0], min_short_side=min_sides[1]),
+    }
+    stats, info = {}, {}
+    for name, source in sources.items():
+        source.open()
+        try:
+            for _ in range(args.warmup):
+                source.read()
+            samples, delivered = [], 0
+            wall_start = time.perf_counter()
+            while delivered < args.frames:
+                start = time.perf_counter()
+                ret, frame, _ = source.read() # blocks until the camera delivers, so this includes waiting on the camera
+                if not ret:
+                    continue
+                to_tensor(frame if source.rgb else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), args.imgsz, args.inference_mode)
+                samples.append((time.perf_counter() - start) * 1000)
+                delivered += 1
+            stats[name] = summarise(samples)
+            info[name] = {'fps': delivered / (time.perf_counter() - wall_start), 'frame_size': list(frame.shape[:2]),
+                          'fourcc': source.fourcc}
+            if isinstance(source, MJPEGCameraSource):
+                info[name].update(compressed=source.compressed, decoder=source.decoder.backend, decode_failures=source.decode_failures)
+        finally:
+            source.release()
+    return stats, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time capture-to-tensor per frame for the raw and MJPEG capture paths")
+    parser.add_argument('--camera', type=int, default=None, help="benchmark this webcam; otherwise JPEG-encoded images stand in for it")
+    parser.add_argument('--images', default='training_data')
+    parser.add_argument('--limit', type=int, default=50, help="images used for the offline benchmark")
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--quality', type=int, default=85, help="JPEG quality of the offline frames")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--inference-mode', default='full', choices=['full', 'roi'])
+    parser.add_argument('--roi-size', type=int, default=None)
+    parser.add_argument('--frames', type=int, default=300, help="frames timed per capture path in live mode")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--output', default=None, help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    # the same minimum decode size VideoProcessing asks MJPEGCameraSource for
+    min_sides = (None, args.roi_size or args.imgsz) if args.inference_mode == 'roi' else (args.imgsz, None)
+    stats, info = run_live(args, min_sides) if args.camera is not None else run_offline(args, min_sides)
+
+    print(json.dumps(info, indent=2))
+    print(f"{'path':<26}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, path_stats in stats.items():
+        print(f"{name:<26}{path_stats['mean_ms']:>10.3f}{path_stats['p50_ms']:>10.3f}{path_stats['p95_ms']:>10.3f}{path_stats['p99_ms']:>10.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'info': info, 'paths': stats}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import sys
+import time
+import numpy as np
+from dart_consensus import cluster_predictions, merge_into_visit
+
+
+def reference_cluster_predictions(pred_queue, match_radius, repeat_threshold):
+    """The original nested-loop clustering from VideoProcessing._process_predictions"""
+    unique_predictions = np.unique(pred_queue[pred_queue != -1].reshape(-1,2), axis=0)
+    matches = {tuple(pred): [] for pred in unique_predictions}
+    for frame in pred_queue:
+        for pred in frame:
+            if np.any(pred == -1):
+                continue
+            for unique_pred in unique_predictions:
+                if np.sqrt(np.sum((pred - unique_pred) ** 2)) < match_radius:
+                    matches[tuple(unique_pred)].append(pred)
+                    break
+    matches = {k: v for k, v in sorted(matches.items(), key=lambda item: len(item[1]), reverse=True) if len(v) >= repeat_threshold}
+    return np.array([np.mean(match_, axis=0) for match_ in matches.values()]).reshape(-1, 2)
+
+
+def make_queue(rng, queue_length, jitter=0.002, miss_rate=0.2, false_positive_rate=0.05):
+    """Synthetic prediction queue: 3 darts with detection jitter, missed detections and false positives"""
+    darts = rng.uniform(0.2, 0.8, size=(3, 2))
+    queue = -np.ones((queue_length, 3, 2))
+    for i in range(queue_length):
+        for j in range(3):
+            if rng.random() < false_positive_rate:
+                queue[i, j] = rng.uniform(0, 1, size=2)
+            elif rng.random() > miss_rate:
+                queue[i, j] = darts[j] + rng.normal(0, jitter, size=2)
+    return queue
+
+
+def time_per_call(func, queues, *args):
+    start = time.perf_counter()
+    for queue in queues:
+        func(queue, *args)
+    return (time.perf_counter() - start) / len(queues)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark for the dart-consensus clustering")
+    parser.add_argument('--queue-lengths', type=int, nargs='+', default=[5, 15, 30])
+    parser.add_argument('--match-radius', type=float, default=0.01)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--budget-ms', type=float, default=1.0, help="per-frame budget for the vectorised clustering")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    over_budget = False
+    print(f"{'queue':>6}{'threshold':>11}{'loops ms':>11}{'numpy ms':>11}{'speedup':>9}{'match':>7}")
+    for queue_length in args.queue_lengths:
+        repeat_threshold = max(3, queue_length * 3 // 5) # same 3-of-5 ratio as the default queue
+        queues = [make_queue(rng, queue_length) for _ in range(args.iterations)]
+
+        matched = all(np.allclose(reference_cluster_predictions(q, args.match_radius, repeat_threshold),
+                                  cluster_predictions(q, args.match_radius, repeat_threshold)) for q in queues[:50])
+        reference_ms = time_per_call(reference_cluster_predictions, queues, args.match_radius, repeat_threshold) * 1000
+        vectorised_ms = time_per_call(lambda q: merge_into_visit([], cluster_predictions(q, args.match_radius, repeat_threshold), args.match_radius), queues) * 1000
+        over_budget |= vectorised_ms > args.budget_ms
+
+        print(f"{queue_length:>6}{repeat_threshold:>11}{reference_ms:>11.3f}{vectorised_ms:>11.3f}{reference_ms / vectorised_ms:>8.1f}x{'yes' if matched else 'NO':>7}")
+
+    if over_budget:
+        print(f"Vectorised clustering exceeded the {args.budget_ms} ms per-frame budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import numpy as np
+from calibration_tracker import CalibrationTracker
+from capture import ImageDirectorySource
+from dart_tracker import DartTracker
+from metrics import PipelineMetrics
+from model_registry import registry
+from motion_gate import MotionGate
+from scorer import Scorer
+from video_processing import VideoProcessing
+
+BENCHMARK_START_SCORE = 10 ** 6 # the game never finishes mid-run
+
+
+def summarise(metrics):
+    """p50/p95/p99 and throughput per stage from the observations kept by PipelineMetrics(keep_observations=True)"""
+    stats = {}
+    for stage, histogram in metrics.stages.items():
+        if not histogram.observations:
+            continue
+        samples = np.array(histogram.observations) * 1000
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        stats[stage] = {
+            'count': len(samples),
+            'mean_ms': float(samples.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'throughput_per_s': float(1000 / samples.mean()) if samples.mean() > 0 else float('inf'),
+        }
+    return stats
+
+
+def find_regressions(current, baseline, tolerance, min_delta_ms):
+    """Stages whose p50 or p95 grew by more than `tolerance` (fraction) and `min_delta_ms` over the baseline"""
+    regressions = []
+    for stage, stats in current.items():
+        if stage not in baseline:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            before, after = baseline[stage][metric], stats[metric]
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                regressions.append(f"{stage} {metric}: {before:.3f} -> {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the VideoProcessing loop, run on a folder of images played back as a video")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--images', default='training_data')
+    parser.add_argument('--inference-mode', default='full', choices=['full', 'roi'])
+    parser.add_argument('--roi-size', type=int, default=None)
+    parser.add_argument('--score-lut', type=int, default=None, metavar='RESOLUTION', help="score with a lookup table of this resolution")
+    parser.add_argument('--tracker', action='store_true', help="use the Kalman/Hungarian dart tracker instead of queue voting")
+    parser.add_argument('--lock-calibration', action='store_true', help="lock the homography once calibration is stable")
+    parser.add_argument('--motion-gate', action='store_true', help="only run the model when the board region changed")
+    parser.add_argument('--repeat', type=int, default=3, help="frames each image is fed for, so the commit logic sees repeated detections")
+    parser.add_argument('--warmup', type=int, default=5, help="frames run before timing starts")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="results JSON from an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed fractional slowdown against the baseline")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore slowdowns smaller than this, in ms")
+    args = parser.parse_args()
+
+    score_lut = registry.get_score_lut(args.weights, args.score_lut) if args.score_lut else None
+    def make_processing(metrics=None):
+        return VideoProcessing(args.weights, backend=args.backend, int8=args.int8, headless=True,
+                               inference_mode=args.inference_mode, roi_size=args.roi_size, score_lut=score_lut,
+                               tracker=DartTracker() if args.tracker else None,
+                               calibration_tracker=CalibrationTracker() if args.lock_calibration else None,
+                               motion_gate=MotionGate() if args.motion_gate else None, metrics=metrics)
+
+    # the production loop itself, fed by a recorded source so every frame is processed
+    if not os.path.isdir(args.images):
+        raise SystemExit(f"No images found in {args.images}")
+    source = ImageDirectorySource(args.images, repeat=args.repeat)
+    if not source.paths:
+        raise SystemExit(f"No images found in {args.images}")
+    warmup = ImageDirectorySource(args.images, repeat=args.warmup)
+    warmup.paths = warmup.paths[:1]
+    # warm up on a throwaway instance: the model is shared through the registry, the timed run's metrics stay clean
+    warm = make_processing()
+    warm.load_model()
+    warm.start(None, Scorer(start_score=BENCHMARK_START_SCORE), source=warmup)
+
+    metrics = PipelineMetrics(keep_observations=True)
+    vp = make_processing(metrics)
+    vp.load_model()
+    vp.start(None, Scorer(start_score=BENCHMARK_START_SCORE), source=source)
+    frames, skipped = metrics.frames_processed.value, metrics.calibration_failures.value
+
+    stats = summarise(metrics)
+    print(f"{frames} frames from {len(source.paths)} images, {skipped} skipped for missing calibration points")
+    print(f"{'stage':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}")
+    for stage, stage_stats in stats.items():
+        print(f"{stage:<26}{stage_stats['p50_ms']:>10.3f}{stage_stats['p95_ms']:>10.3f}{stage_stats['p99_ms']:>10.3f}{stage_stats['throughput_per_s']:>10.1f}")
+
+    results = {
+        'config': {'weights': args.weights, 'backend': args.backend, 'int8': args.int8, 'inference_mode': args.inference_mode,
+                   'roi_size': args.roi_size, 'score_lut': args.score_lut, 'tracker': args.tracker,
+                   'lock_calibration': args.lock_calibration, 'motion_gate': args.motion_gate, 'images': args.images, 'repeat': args.repeat},
+        'machine': {'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()},
+        'frames': frames,
+        'skipped': skipped,
+        'stages': stats,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print("Warning: baseline was run with a different configuration")
+        regressions = find_regressions(stats, baseline['stages'], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("Regressions against baseline:\n  " + '\n  '.join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ProfileStore:
+    """
+    Calibration profiles keyed by camera identity (FrameSource.identity, e.g. 'camera:0'), kept in
+    one JSON file.
+
+    A profile is a dict of sections, e.g. 'calibration' (last good calibration points, homography
+    and crop, written by VideoProcessing) and 'detector' (geodetect's parameters). update() only
+    changes the in-memory copy; a background thread (started by the first update) writes the file at
+    most once every `debounce` seconds, so callers on the capture loop or a key handler never wait on
+    the disk. A write merges only the sections changed here into the file as it is on disk, under a
+    lock file, so several stores (e.g. the pipeline's and geodetect's, possibly in other processes)
+    can share it without erasing each other's sections. Writes go to a temporary file that is then
+    renamed over the old one, so a crash can't leave a half-written file.
+    """
+    def __init__(self, path='calibration_profiles.json', debounce=2.0):
+        self.path = path
+        self.debounce = debounce
+        self.writes = 0
+        self._profiles = self._read()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock() # keeps snapshots hitting the disk in the order they were taken
+        self._dirty_since = None
+        self._dirty = {} # identity -> sections changed since the last write
+        self._closed = False
+        self._writer = None
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error loading calibration profiles: {e}. Starting without profiles.")
+            return {}
+
+    def get(self, identity, section=None):
+        """Copy of a camera's profile (or one section of it), None if there is none"""
+        with self._condition:
+            profile = self._profiles.get(identity)
+            if profile is not None and section is not None:
+                profile = profile.get(section)
+            return json.loads(json.dumps(profile)) if profile is not None else None
+
+    def update(self, identity, **sections):
+        """Replace the given sections of a camera's profile; values must be JSON serialisable"""
+        with self._condition:
+            profile = self._profiles.setdefault(identity, {})
+            profile.update(sections)
+            profile['updated'] = time.time()
+            self._dirty.setdefault(identity, set()).update(sections, ['updated'])
+            if self._writer is None and not self._closed:
+                self._writer = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+                self._condition.notify()
+
+    def _write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.profiles-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self.writes += 1
+        except OSError as e:
+            print(f"Error saving calibration profiles: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._dirty_since is not None or self._closed)
+                if self._dirty_since is None: # closed with nothing to write
+                    return
+                delay = self._dirty_since + self.debounce - time.monotonic()
+                if delay > 0 and not self._closed:
+                    self._condition.wait(delay) # let further updates in the burst pile up
+                    continue
+            self.flush()
+
+    @contextmanager
+    def _file_lock(self, timeout=5.0, stale=30.0):
+        """Lock file shared with other stores and processes; a lock older than `stale` seconds is assumed abandoned"""
+        lock_path = self.path + '.lock'
+        deadline = time.monotonic() + timeout
+        fd = None
+        while fd is None:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > stale:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue # released meanwhile
+                if time.monotonic() > deadline:
+                    print(f"Timed out waiting for {lock_path}, writing calibration profiles without it")
+                    break
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+                os.remove(lock_path)
+
+    def flush(self):
+        """Write pending changes now, on the calling thread"""
+        with self._write_lock:
+            with self._condition:
+                if self._dirty_since is None:
+                    return
+                self._dirty_since = None
+                changes = {identity: {section: self._profiles[identity][section] for section in sections}
+                           for identity, sections in self._dirty.items()}
+                changes = json.loads(json.dumps(changes))
+                self._dirty = {}
+            with self._file_lock():
+                profiles = self._read()
+                for identity, sections in changes.items():
+                    profiles.setdefault(identity, {}).update(sections)
+                self._write(json.dumps(profiles, indent=2))
+            with self._condition:
+                # pick up what other stores wrote, keeping anything changed here since the snapshot
+                for identity, profile in profiles.items():
+                    pending = self._dirty.get(identity, ())
+                    mine = self._profiles.setdefault(identity, {})
+                    mine.update({section: value for section, value in profile.items() if section not in pending})
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._writer is not None:
+            self._writer.join(timeout=5.0)
+        self.flush()
@@ -0,0 +1,112 @@
+from collections import deque
+import numpy as np
+
+
+class CalibrationTracker:
+    """
+    Keeps a locked homography while the camera and board don't move.
+
+    While unlocked the homography is solved every frame. Once the detected calibration points have
+    stayed within `tolerance` of each other for `stable_frames` frames, the homography is solved once
+    on the averaged points and locked. While locked the solve is skipped; the lock is released when
+    the points drift past `tolerance` for `unlock_frames` consecutive frames or when the user
+    calibration changes. on_event(kind, info) is called with 'lock' and 'unlock' events.
+
+    warm_start() locks straight away on saved calibration points (e.g. from a ProfileStore). The
+    saved lock is then checked against live detections with the same drift test; it is reported
+    'validated' after `stable_frames` agreeing frames, or dropped like any other lock if it drifts.
+    """
+    def __init__(self, stable_frames=10, tolerance=0.005, unlock_frames=3, on_event=None):
+        self.stable_frames = stable_frames
+        self.tolerance = tolerance
+        self.unlock_frames = unlock_frames
+        self.on_event = on_event
+        self.reset()
+
+    def reset(self):
+        self.locked = False
+        self.H_matrix = None
+        self.reference_coords = None # averaged calibration coords the locked homography was solved on
+        self.reference_valid = None
+        self._window = deque(maxlen=self.stable_frames)
+        self._drift_count = 0
+        self._user_calibration = None
+        self.warm_started = False # locked on saved points that live detections haven't confirmed yet
+        self._agreeing_frames = 0
+
+    def _emit(self, kind, **info):
+        if self.on_event is not None:
+            self.on_event(kind, info)
+
+    def _unlock(self, reason, drift=None):
+        self.locked = False
+        self.H_matrix = None
+        self._window.clear()
+        self._drift_count = 0
+        self._emit('unlock', reason=reason, drift=drift, warm_start=self.warm_started)
+        self.warm_started = False
+
+    def warm_start(self, calibration_coords, valid, solve):
+        """Lock on previously saved calibration points without waiting for a stable run of frames"""
+        self.reset()
+        self.reference_coords = np.asarray(calibration_coords, dtype=np.float64)
+        self.reference_valid = np.asarray(valid, dtype=bool)
+        self.H_matrix = solve(self.reference_coords)
+        self.locked = True
+        self.warm_started = True
+        self._emit('lock', points=int(np.sum(self.reference_valid)), warm_start=True)
+        return self.H_matrix
+
+    def _max_drift(self, coords_a, valid_a, coords_b, valid_b):
+        both = valid_a & valid_b
+        if not np.any(both):
+            return np.inf
+        return float(np.max(np.linalg.norm(coords_a[both] - coords_b[both], axis=1)))
+
+    def update(self, calibration_coords, valid, user_calibration, solve):
+        """
+        calibration_coords: (6, 2) crop-normalised calibration points for this frame
+        valid: (6,) bool mask of the points that were actually detected or set by the user
+        solve: callable taking calibration coords and returning the homography
+        Returns the homography to use for this frame.
+        """
+        if self._user_calibration is not None and not np.array_equal(user_calibration, self._user_calibration):
+            if self.locked:
+                self._unlock('user_calibration')
+            else:
+                self._window.clear()
+        self._user_calibration = user_calibration.copy()
+
+        if self.locked:
+            drift = self._max_drift(calibration_coords, valid, self.reference_coords, self.reference_valid)
+            if drift <= self.tolerance:
+                self._drift_count = 0
+                if self.warm_started:
+                    self._agreeing_frames += 1
+                    if self._agreeing_frames >= self.stable_frames:
+                        self.warm_started = False
+                        self._emit('validated', frames=self._agreeing_frames)
+                return self.H_matrix
+            self._drift_count += 1
+            if self._drift_count < self.unlock_frames:
+                return self.H_matrix # ignore short bursts of detection noise
+            self._unlock('drift', drift)
+
+        # unlocked: solve every frame and look for a stable run of points to lock on
+        if self._window:
+            last_coords, last_valid = self._window[-1]
+            if self._max_drift(calibration_coords, valid, last_coords, last_valid) > self.tolerance or not np.array_equal(valid, last_valid):
+                self._window.clear()
+        self._window.append((calibration_coords.copy(), valid.copy()))
+
+        if len(self._window) < self.stable_frames:
+            return solve(calibration_coords)
+
+        averaged = np.mean([coords for coords, _ in self._window], axis=0)
+        self.H_matrix = solve(averaged)
+        self.reference_coords = averaged
+        self.reference_valid = valid.copy()
+        self.locked = True
+        self._drift_count = 0
+        self._emit('lock', points=int(np.sum(valid)))
+        return self.H_matrix
@@ -0,0 +1,169 @@
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from glob import glob
+import cv2
+from capture import CameraSource
+
+
+class CameraDevice:
+    """
+    A camera found by discovery. stable_id survives reboots and re-plugging where the platform
+    offers one (the /dev/v4l/by-id link on Linux); index is what cv2.VideoCapture takes today.
+    """
+    def __init__(self, index, path=None, stable_id=None, name=None, capture_node=True):
+        self.index = index
+        self.path = path
+        self.stable_id = stable_id or path or f"index:{index}"
+        self.name = name
+        self.capture_node = capture_node
+        self.cached = False # chosen from the cache without probing
+
+    def __repr__(self):
+        return f"CameraDevice({self.index}, {self.stable_id!r}, {self.name!r})"
+
+
+def _video_index(path):
+    name = os.path.basename(path)
+    return int(name[5:]) if name.startswith('video') and name[5:].isdigit() else None
+
+
+def _read_sysfs(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def enumerate_devices(max_index=5):
+    """
+    List candidate cameras without opening them. On Linux the V4L2 nodes are read from /dev and
+    sysfs, capture nodes first (UVC cameras also expose metadata nodes that can't deliver frames).
+    Elsewhere there is nothing to enumerate, so indices 0..max_index-1 are returned.
+    """
+    if platform.system() != 'Linux':
+        return [CameraDevice(index) for index in range(max_index)]
+
+    by_id = {}
+    for link in sorted(glob('/dev/v4l/by-id/*')):
+        by_id.setdefault(os.path.realpath(link), link)
+
+    devices = []
+    for path in glob('/dev/video*'):
+        index = _video_index(path)
+        if index is None:
+            continue
+        sys_dir = f"/sys/class/video4linux/video{index}"
+        interface = _read_sysfs(os.path.join(sys_dir, 'index')) # 0 for the capture node of a UVC camera
+        devices.append(CameraDevice(index, path, by_id.get(os.path.realpath(path)), _read_sysfs(os.path.join(sys_dir, 'name')),
+                                    capture_node=interface in (None, '0')))
+    devices.sort(key=lambda device: (not device.capture_node, device.index))
+    return devices
+
+
+def _probe(device):
+    """Open the device and read one frame"""
+    try:
+        if platform.system() == "Windows":
+            cap = cv2.VideoCapture(device.index, cv2.CAP_DSHOW)
+        elif device.path is not None:
+            cap = cv2.VideoCapture(device.path, cv2.CAP_V4L2)
+        else:
+            cap = cv2.VideoCapture(device.index)
+        try:
+            return cap.isOpened() and cap.read()[0]
+        finally:
+            cap.release()
+    except cv2.error:
+        return False
+
+
+class CameraDiscovery:
+    """
+    Finds a working webcam. The device that last worked is remembered by stable ID in `cache_file`;
+    if it is still present it is used straight away without probing. Otherwise the enumerated
+    candidates are probed concurrently, and the best one that delivers a frame within `timeout`
+    seconds wins. open() does the whole sequence: find, check that the camera delivers a frame,
+    re-discover once if the cached device doesn't, and remember the one that works.
+    """
+    def __init__(self, cache_file='camera_cache.json', timeout=3.0, max_index=5):
+        self.cache_file = cache_file
+        self.timeout = timeout
+        self.max_index = max_index
+
+    def _cached_id(self):
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f).get('stable_id')
+        except (OSError, ValueError):
+            return None
+
+    def remember(self, device):
+        if device.cached:
+            return
+        temp_path = self.cache_file + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'stable_id': device.stable_id, 'path': device.path, 'index': device.index, 'name': device.name}, f, indent=2)
+        os.replace(temp_path, self.cache_file)
+
+    def forget(self):
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+    def probe(self, devices):
+        """Working devices among `devices`, in the order given; probes still running at the timeout are abandoned"""
+        if not devices:
+            return []
+        pool = ThreadPoolExecutor(max_workers=len(devices), thread_name_prefix="camera-probe")
+        futures = {pool.submit(_probe, device): device for device in devices}
+        done, _ = wait(futures, timeout=self.timeout)
+        pool.shutdown(wait=False)
+        working = [futures[future] for future in done if future.result()]
+        return sorted(working, key=devices.index)
+
+    def find(self):
+        devices = enumerate_devices(self.max_index)
+        cached_id = self._cached_id()
+        for device in devices:
+            if device.stable_id == cached_id:
+                device.cached = True
+                return device
+
+        working = self.probe(devices)
+        if working:
+            return working[0]
+        return CameraDevice(0) # nothing answered, fall back to the default camera
+
+    def _open_checked(self, make_source, device):
+        """Open the device's source and read one frame; a node that opens but never delivers (busy, metadata-only) raises"""
+        source = make_source(device).open()
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if source.read()[0]:
+                return source
+            time.sleep(0.01)
+        source.release()
+        raise RuntimeError(f"Webcam {device.stable_id} opened but delivered no frame")
+
+    def open(self, make_source=None):
+        """
+        Open the discovered webcam as a FrameSource, by default CameraSource(device.index); pass
+        make_source(device) to build another (e.g. an MJPEGCameraSource at a set resolution). If the
+        cached device fails to open or deliver a frame it is forgotten and discovery runs once more.
+        """
+        if make_source is None:
+            make_source = lambda device: CameraSource(device.index, stable_id=device.stable_id)
+        device = self.find()
+        try:
+            source = self._open_checked(make_source, device)
+        except RuntimeError:
+            if not device.cached:
+                raise
+            self.forget()
+            device = self.find()
+            source = self._open_checked(make_source, device)
+        self.remember(device)
+        return source
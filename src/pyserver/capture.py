@@ -0,0 +1,357 @@
+import os
+import platform
+import threading
+import time
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """
+    Where frames come from. read() returns (ok, frame, timestamp); once a recorded source is
+    exhausted it returns (False, None, None) and `exhausted` is set. Live sources are read through a
+    CaptureThread and latest-frame buffer, recorded sources are read in order so every frame is processed.
+    """
+    live = False
+    rgb = False # frames come out in RGB order, ready for the model, rather than OpenCV's BGR
+
+    def __init__(self):
+        self.exhausted = False
+
+    def open(self):
+        return self
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    @property
+    def identity(self):
+        """Stable name for the source, e.g. for logs"""
+        raise NotImplementedError
+
+
+class CameraSource(FrameSource):
+    """
+    Live webcam, timestamped with the monotonic clock at capture. stable_id (e.g. the device's
+    /dev/v4l/by-id path from CameraDiscovery) makes the identity independent of enumeration order.
+    """
+    live = True
+
+    def __init__(self, index, resolution=None, fps=30, stable_id=None):
+        super().__init__()
+        self.index = index
+        self.stable_id = stable_id
+        self.resolution = resolution # (height, width)
+        self.fps = fps
+        self.cap = None
+
+    def open(self):
+        # On Windows, create VideoCapture with DirectShow backend for better compatibility
+        if platform.system() == "Windows":
+            self.cap = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+        else:
+            self.cap = cv2.VideoCapture(self.index)
+        self._set_format()
+
+        # Set webcam properties for better performance
+        if self.resolution is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(self.resolution[1]))  # width
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(self.resolution[0]))  # height
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+
+        if not self.cap.isOpened():
+            self.cap.release()
+            raise RuntimeError(f"Could not open webcam at index {self.index}")
+        return self
+
+    def _set_format(self):
+        """Hook for requesting a pixel format; runs before the size is set, as V4L2 drivers pick modes per format"""
+        pass
+
+    def read(self):
+        # grab() latches the frame, retrieve() decodes it: the timestamp is the capture time, not
+        # the time decoding finished
+        if not self.cap.grab():
+            return False, None, time.monotonic()
+        timestamp = time.monotonic()
+        ret, frame = self.cap.retrieve()
+        return ret, frame, timestamp
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    @property
+    def fourcc(self):
+        """Pixel format the camera was opened in, e.g. 'MJPG' or 'YUYV'"""
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC)) if self.cap is not None else 0
+        return ''.join(chr((code >> shift) & 0xFF) for shift in (0, 8, 16, 24))
+
+    @property
+    def identity(self):
+        return f"camera:{self.stable_id or self.index}"
+
+
+class JpegDecoder:
+    """
+    Decodes camera JPEGs straight to RGB, shrunk by the largest of 1/8, 1/4 or 1/2 that still
+    leaves the long side at least min_long_side and the short side at least min_short_side pixels.
+    The IDCT does the downscaling, so the discarded resolution is never decoded. PyTurboJPEG is used
+    if it is installed (scaled decode straight into RGB), otherwise cv2.imdecode's
+    IMREAD_REDUCED_COLOR_* modes followed by a BGR->RGB conversion of the small image.
+    The scale is chosen from the first frame and kept, so every frame has the same size.
+    """
+    REDUCED_MODES = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+    def __init__(self, min_long_side=None, min_short_side=None, use_turbojpeg=True):
+        self.min_long_side = min_long_side or 0
+        self.min_short_side = min_short_side or 0
+        self.denominator = None
+        self._turbojpeg = None
+        if use_turbojpeg:
+            try:
+                from turbojpeg import TurboJPEG, TJPF_RGB
+                self._turbojpeg = TurboJPEG()
+                self._pixel_format = TJPF_RGB
+            except (ImportError, OSError, RuntimeError): # package or libturbojpeg not installed
+                self._turbojpeg = None
+
+    @property
+    def backend(self):
+        return 'turbojpeg' if self._turbojpeg is not None else 'opencv'
+
+    def _choose_denominator(self, data):
+        if self._turbojpeg is not None:
+            width, height = self._turbojpeg.decode_header(data)[:2]
+        else:
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if image is None:
+                return None
+            height, width = image.shape[:2]
+        for denominator in (8, 4, 2):
+            # libjpeg rounds scaled sizes up
+            if -(-max(height, width) // denominator) >= self.min_long_side and -(-min(height, width) // denominator) >= self.min_short_side:
+                return denominator
+        return 1
+
+    def decode(self, data):
+        """RGB image from an encoded JPEG buffer (uint8 array), None if it can't be decoded"""
+        try:
+            if self.denominator is None:
+                self.denominator = self._choose_denominator(data)
+                if self.denominator is None:
+                    return None
+            if self._turbojpeg is not None:
+                return self._turbojpeg.decode(data, pixel_format=self._pixel_format, scaling_factor=(1, self.denominator))
+            image = cv2.imdecode(data, self.REDUCED_MODES[self.denominator])
+        except (OSError, cv2.error): # truncated or corrupt frame
+            return None
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image is not None else None
+
+
+class MJPEGCameraSource(CameraSource):
+    """
+    Live webcam asking for MJPEG instead of the driver's default (often raw YUYV, which USB
+    bandwidth limits to a few frames per second at 1080p). OpenCV's own conversion is switched off
+    so read() gets the compressed frame and decodes it with a JpegDecoder: straight to RGB and no
+    bigger than the model needs, on the capture thread. Cameras or backends that ignore the request
+    still work; their frames are converted to RGB at full size and `compressed` ends up False.
+    """
+    rgb = True
+
+    def __init__(self, index, resolution=None, fps=30, stable_id=None, min_long_side=None, min_short_side=None, use_turbojpeg=True):
+        super().__init__(index, resolution, fps, stable_id)
+        self.decoder = JpegDecoder(min_long_side, min_short_side, use_turbojpeg)
+        self.compressed = None # whether the camera is delivering undecoded JPEGs, known after the first read
+        self.decode_failures = 0
+
+    def _set_format(self):
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+    def read(self):
+        if not self.cap.grab():
+            return False, None, time.monotonic()
+        timestamp = time.monotonic() # capture time, before decoding
+        ret, frame = self.cap.retrieve()
+        if not ret:
+            return False, None, timestamp
+        if frame.ndim == 3 and frame.shape[2] == 3: # already decoded by the backend
+            self.compressed = False
+            return True, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), timestamp
+        self.compressed = True
+        frame = self.decoder.decode(frame.reshape(-1))
+        if frame is None:
+            self.decode_failures += 1
+            return False, None, timestamp
+        return True, frame, timestamp
+
+
+class VideoFileSource(FrameSource):
+    """
+    Recorded video, timestamped from the file's own timeline. With realtime=False frames are
+    delivered as fast as they can be decoded.
+    """
+    def __init__(self, path, realtime=False):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.cap = None
+        self._start = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video file {self.path}")
+        self._start = time.monotonic()
+        return self
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.exhausted = True
+            return False, None, None
+        timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if self.realtime:
+            time.sleep(max(0.0, self._start + timestamp - time.monotonic()))
+        return True, frame, timestamp
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    @property
+    def identity(self):
+        return f"file:{os.path.abspath(self.path)}"
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    Folder of still images (e.g. training_data/) played back in name order as a video at `fps`.
+    Each image is delivered `repeat` times so the frame-count based commit logic can settle on it.
+    """
+    def __init__(self, directory, fps=30, repeat=5, realtime=False):
+        super().__init__()
+        self.directory = directory
+        self.fps = fps
+        self.repeat = repeat
+        self.realtime = realtime
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+        self._frame_index = 0
+        self._current = (None, None) # (path index, decoded image)
+        self._start = None
+
+    def open(self):
+        if not self.paths:
+            raise RuntimeError(f"No images found in {self.directory}")
+        self._start = time.monotonic()
+        return self
+
+    def read(self):
+        while True:
+            path_index = self._frame_index // self.repeat
+            if path_index >= len(self.paths):
+                self.exhausted = True
+                return False, None, None
+            if self._current[0] != path_index:
+                self._current = (path_index, cv2.imread(self.paths[path_index]))
+            if self._current[1] is not None:
+                break
+            self._frame_index = (path_index + 1) * self.repeat # unreadable image, skip it
+
+        timestamp = self._frame_index / self.fps
+        self._frame_index += 1
+        if self.realtime:
+            time.sleep(max(0.0, self._start + timestamp - time.monotonic()))
+        return True, self._current[1], timestamp
+
+    @property
+    def current_path(self):
+        return self.paths[self._current[0]] if self._current[0] is not None else None
+
+    @property
+    def identity(self):
+        return f"images:{os.path.abspath(self.directory)}"
+
+
+class LatestFrameBuffer:
+    """Single-slot frame buffer that always keeps only the newest frame"""
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._frame_id = 0 # id of the newest frame written
+        self._read_id = 0 # id of the last frame handed to a consumer
+        self._closed = False
+        self.frames_written = 0
+        self.frames_dropped = 0
+
+    def put(self, frame, timestamp=None):
+        with self._condition:
+            if self._frame_id > self._read_id:
+                self.frames_dropped += 1 # previous frame was never consumed, overwrite it
+            self._frame = frame
+            self._timestamp = time.time() if timestamp is None else timestamp
+            self._frame_id += 1
+            self.frames_written += 1
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Block until a frame newer than the last one returned is available.
+        Returns (frame, timestamp, frame_id) or (None, None, None) on timeout/close.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._frame_id > self._read_id or self._closed, timeout):
+                return None, None, None
+            if self._frame_id <= self._read_id: # closed with nothing new
+                return None, None, None
+            self._read_id = self._frame_id
+            return self._frame, self._timestamp, self._frame_id
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class CaptureThread(threading.Thread):
+    """
+    Producer thread that reads frames from a FrameSource into a LatestFrameBuffer. The thread owns
+    the source once started and releases it itself on exit, so a stop() that times out while a
+    read() is still blocked never releases the capture from under it.
+    """
+    def __init__(self, source, buffer=None):
+        super().__init__(name="capture", daemon=True)
+        self.source = source
+        self.buffer = buffer if buffer is not None else LatestFrameBuffer()
+        self.read_failures = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                ret, frame, timestamp = self.source.read()
+                if not ret:
+                    if self.source.exhausted:
+                        break
+                    self.read_failures += 1
+                    time.sleep(0.005) # avoid spinning on a camera that has stopped delivering
+                    continue
+                self.buffer.put(frame, timestamp)
+        finally:
+            self.buffer.close()
+            self.source.release()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
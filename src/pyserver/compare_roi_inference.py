@@ -0,0 +1,104 @@
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from video_processing import VideoProcessing
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def list_images(image_dir):
+    return sorted(os.path.join(image_dir, name) for name in os.listdir(image_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def detect(vp, frame_rgb, inference_mode):
+    """Run one inference in the given mode and return timing plus crop-normalised coords"""
+    vp.inference_mode = inference_mode
+    resolution = np.array(frame_rgb.shape[:2], dtype=np.float64)
+    crop_size = min(resolution)
+    crop_start = resolution/2 - crop_size/2
+
+    start = time.perf_counter()
+    result = vp._infer(frame_rgb)[0]
+    elapsed = time.perf_counter() - start
+
+    calibration_coords, dart_coords = vp.predict.process_yolo_output(result)
+    found = np.all(calibration_coords != -1, axis=1)
+    calibration_coords, dart_coords = vp._to_crop_coords(calibration_coords, dart_coords, resolution, crop_start, crop_size)
+    return elapsed, calibration_coords, found, np.asarray(dart_coords).reshape(-1, 2), crop_size
+
+
+def dart_errors(reference, candidate):
+    """Nearest-neighbour distance from each reference dart to the candidate darts"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return np.array([])
+    distances = np.linalg.norm(reference[:, None, :] - candidate[None, :, :], axis=2)
+    return distances.min(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-frame and ROI-cropped inference latency and accuracy")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--images', default='training_data')
+    parser.add_argument('--roi-size', type=int, default=None, help="downscale the ROI to this many pixels square")
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    vp = VideoProcessing(args.weights, headless=True, roi_size=args.roi_size)
+    paths = list_images(args.images)
+    if not paths:
+        raise SystemExit(f"No images found in {args.images}")
+
+    warmup_frame = cv2.cvtColor(cv2.imread(paths[0]), cv2.COLOR_BGR2RGB)
+    for _ in range(args.warmup):
+        detect(vp, warmup_frame, 'full')
+        detect(vp, warmup_frame, 'roi')
+
+    timings = {'full': [], 'roi': []}
+    pixels = {'full': 0, 'roi': 0}
+    calibration_errors, calibration_agree, calibration_total = [], 0, 0
+    dart_count_agree, all_dart_errors = 0, []
+
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        t_full, cal_full, found_full, darts_full, crop_size = detect(vp, frame_rgb, 'full')
+        t_roi, cal_roi, found_roi, darts_roi, _ = detect(vp, frame_rgb, 'roi')
+        timings['full'].append(t_full)
+        timings['roi'].append(t_roi)
+        pixels['full'] += frame_rgb.shape[0] * frame_rgb.shape[1]
+        roi_side = min(crop_size, args.roi_size) if args.roi_size else crop_size
+        pixels['roi'] += int(roi_side) ** 2
+
+        # calibration points: agreement on which were found, and pixel error where both found them
+        calibration_total += len(found_full)
+        calibration_agree += int(np.sum(found_full == found_roi))
+        both = found_full & found_roi
+        if np.any(both):
+            calibration_errors.extend(np.linalg.norm(cal_full[both] - cal_roi[both], axis=1) * crop_size)
+
+        dart_count_agree += int(len(darts_full) == len(darts_roi))
+        all_dart_errors.extend(dart_errors(darts_full, darts_roi) * crop_size)
+
+    n = len(timings['full'])
+    print(f"Images: {n}")
+    print(f"{'mode':<6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Mpx/frame':>12}")
+    for mode in ('full', 'roi'):
+        t = np.array(timings[mode]) * 1000
+        print(f"{mode:<6}{t.mean():>10.1f}{np.percentile(t, 50):>10.1f}{np.percentile(t, 95):>10.1f}{pixels[mode] / n / 1e6:>12.2f}")
+    print(f"Latency reduction: {100 * (1 - np.mean(timings['roi']) / np.mean(timings['full'])):.1f}%")
+    print(f"Pixel reduction: {100 * (1 - pixels['roi'] / pixels['full']):.1f}%")
+    print(f"Calibration point found/missing agreement: {100 * calibration_agree / calibration_total:.1f}%")
+    if calibration_errors:
+        print(f"Calibration point error (px): mean {np.mean(calibration_errors):.2f}, p95 {np.percentile(calibration_errors, 95):.2f}")
+    print(f"Dart count agreement: {100 * dart_count_agree / n:.1f}%")
+    if all_dart_errors:
+        print(f"Dart position error (px): mean {np.mean(all_dart_errors):.2f}, p95 {np.percentile(all_dart_errors, 95):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def cluster_predictions(pred_queue, match_radius=0.01, repeat_threshold=3):
+    """
+    Group the dart predictions in a (frames, 3, 2) queue into consensus darts.
+
+    Every valid prediction is assigned to the first (lexicographically sorted) unique prediction
+    within match_radius of it. Groups with at least repeat_threshold members are returned as their
+    mean positions, most supported first. Padding entries are [-1, -1].
+    """
+    preds = pred_queue.reshape(-1, 2)
+    preds = preds[~np.any(preds == -1, axis=1)]
+    if len(preds) == 0:
+        return np.empty((0, 2))
+
+    unique_predictions = np.unique(preds, axis=0)
+    distances = np.linalg.norm(preds[:, None, :] - unique_predictions[None, :, :], axis=2)
+    within = distances < match_radius # always true for the prediction's own unique entry
+    group = np.argmax(within, axis=1) # first unique prediction within the radius
+
+    counts = np.bincount(group, minlength=len(unique_predictions))
+    sums = np.zeros_like(unique_predictions)
+    np.add.at(sums, group, preds)
+
+    order = np.argsort(-counts, kind='stable') # most supported groups first, ties keep sorted order
+    order = order[counts[order] >= repeat_threshold]
+    return sums[order] / counts[order, None]
+
+
+def merge_into_visit(dart_coords_in_visit, best_predictions, match_radius=0.01, max_darts=3):
+    """Append consensus darts that are not within match_radius of a dart already in the visit"""
+    if len(dart_coords_in_visit) == 0:
+        return [pred for pred in best_predictions[:max_darts]]
+
+    dart_coords_in_visit = list(dart_coords_in_visit)
+    for best_pred in best_predictions:
+        if np.all(np.linalg.norm(np.asarray(dart_coords_in_visit) - best_pred, axis=1) > match_radius):
+            if len(dart_coords_in_visit) == max_darts:
+                break
+            dart_coords_in_visit.append(best_pred)
+    return dart_coords_in_visit
+
+
+def empty_frame_count(pred_queue):
+    """Number of frames in the queue with no dart predictions at all"""
+    return int(np.count_nonzero(np.all(pred_queue.reshape(len(pred_queue), -1) == -1, axis=1)))
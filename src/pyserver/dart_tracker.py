@@ -0,0 +1,103 @@
+import itertools
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class Track:
+    """A single dart tracked on the board plane with a constant-position Kalman filter"""
+    def __init__(self, track_id, position, variance, measurement_variance):
+        self.id = track_id
+        self.position = np.asarray(position, dtype=np.float64).copy()
+        self.covariance = np.eye(2) * variance
+        self.measurement_variance = measurement_variance # adaptive estimate of this dart's detection noise
+        self.hits = 1
+        self.misses = 0
+        self.confirmed = False
+        self.confirmed_at = None
+
+    @property
+    def std(self):
+        """Positional standard deviation, averaged over both axes"""
+        return float(np.sqrt(np.trace(self.covariance) / 2))
+
+
+class DartTracker:
+    """
+    Multi-target tracker for darts on the board plane.
+
+    Detections are assigned to tracks with Hungarian matching on board-plane distance, and each track
+    is smoothed with a Kalman filter. The measurement noise of each track adapts to its innovations,
+    so a dart is confirmed as soon as its positional uncertainty drops below `confirm_std`: stable
+    detections confirm within 1-2 frames while jittery ones take longer. A track is dropped after
+    `max_misses` consecutive frames without a detection.
+    """
+    def __init__(self, gate_distance=0.02, measurement_std=0.002, initial_std=0.004, process_std=0.0002,
+                 confirm_std=0.0025, max_misses=3, noise_smoothing=0.5):
+        self.gate_distance = gate_distance
+        self.measurement_variance = measurement_std ** 2
+        self.initial_variance = initial_std ** 2
+        self.process_variance = process_std ** 2
+        self.confirm_std = confirm_std
+        self.max_misses = max_misses
+        self.noise_smoothing = noise_smoothing
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self.frame_count = 0
+        self.empty_frames = 0 # consecutive frames without any detections
+        self._ids = itertools.count()
+
+    def _predict(self):
+        for track in self.tracks:
+            track.covariance = track.covariance + np.eye(2) * self.process_variance
+
+    def _correct(self, track, measurement):
+        innovation = measurement - track.position
+        # adapt this track's measurement noise to how much its detections actually jump around
+        observed = float(np.dot(innovation, innovation)) / 2
+        track.measurement_variance = max(self.measurement_variance,
+                                         self.noise_smoothing * track.measurement_variance + (1 - self.noise_smoothing) * observed)
+        S = track.covariance + np.eye(2) * track.measurement_variance
+        K = track.covariance @ np.linalg.inv(S)
+        track.position = track.position + K @ innovation
+        track.covariance = (np.eye(2) - K) @ track.covariance
+        track.hits += 1
+        track.misses = 0
+
+    def update(self, detections):
+        """Feed one frame of board-plane dart detections, shape (N, 2). Returns the live tracks."""
+        self.frame_count += 1
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 2)
+        self.empty_frames = self.empty_frames + 1 if len(detections) == 0 else 0
+        self._predict()
+
+        unmatched_detections = set(range(len(detections)))
+        matched_tracks = set()
+        if self.tracks and len(detections):
+            positions = np.array([track.position for track in self.tracks])
+            cost = np.linalg.norm(positions[:, None, :] - detections[None, :, :], axis=2)
+            for t, d in zip(*linear_sum_assignment(cost)):
+                if cost[t, d] > self.gate_distance:
+                    continue
+                self._correct(self.tracks[t], detections[d])
+                matched_tracks.add(t)
+                unmatched_detections.discard(d)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for d in sorted(unmatched_detections):
+            self.tracks.append(Track(next(self._ids), detections[d], self.initial_variance, self.measurement_variance))
+
+        for track in self.tracks:
+            if not track.confirmed and track.misses == 0 and track.std < self.confirm_std:
+                track.confirmed = True
+                track.confirmed_at = self.frame_count
+        return self.tracks
+
+    def confirmed_tracks(self):
+        """Confirmed tracks in the order they were confirmed"""
+        return sorted((track for track in self.tracks if track.confirmed), key=lambda track: (track.confirmed_at, track.id))
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from collections import defaultdict
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+SPLITS = ('train', 'val', 'test')
+MANIFEST = 'manifest.json'
+
+
+def find_label(image_path, label_dir=None):
+    """YOLO label file for an image: in label_dir, next to the image or in a labels/ folder beside it"""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    for directory in (label_dir, os.path.dirname(image_path), os.path.join(os.path.dirname(image_path), 'labels')):
+        if directory is not None and os.path.exists(os.path.join(directory, stem + '.txt')):
+            return os.path.join(directory, stem + '.txt')
+    return None
+
+
+def _hash_file(job):
+    """Content hash of an image and its label file (if any); runs in a pool worker"""
+    image_path, label_path = job
+    digest = hashlib.sha1()
+    with open(image_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    dart_count = None
+    if label_path is not None:
+        with open(label_path, 'rb') as f:
+            label = f.read()
+        digest.update(b'\0label\0' + label)
+        dart_count = sum(1 for line in label.decode().splitlines() if line.split()[:1] == ['4'])
+    return digest.hexdigest(), dart_count
+
+
+def _resize_into_cache(job):
+    """
+    Decode an image, shrink its long side to img_size and store it both as an image file (so
+    ultralytics finds it) and as the .npy array ultralytics' disk cache loads instead of decoding.
+    Runs in a pool worker. Returns the cached shape or None if the image can't be read.
+    """
+    image_path, label_path, cache_image, img_size = job
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    scale = img_size / max(h, w)
+    if scale < 1: # never upscale, ultralytics leaves images at or below imgsz alone
+        image = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+    os.makedirs(os.path.dirname(cache_image), exist_ok=True)
+    cv2.imwrite(cache_image, image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    np.save(os.path.splitext(cache_image)[0] + '.npy', image)
+
+    cache_label = _label_path_for(cache_image)
+    os.makedirs(os.path.dirname(cache_label), exist_ok=True)
+    if label_path is not None:
+        shutil.copyfile(label_path, cache_label) # YOLO labels are normalised, unaffected by the resize
+    elif os.path.exists(cache_label):
+        os.remove(cache_label)
+    return list(image.shape[:2])
+
+
+def _label_path_for(cache_image):
+    """images/<split>/x.jpg -> labels/<split>/x.txt, the layout ultralytics expects"""
+    split_dir = os.path.dirname(cache_image)
+    root = os.path.dirname(os.path.dirname(split_dir))
+    stem = os.path.splitext(os.path.basename(cache_image))[0]
+    return os.path.join(root, 'labels', os.path.basename(split_dir), stem + '.txt')
+
+
+def _remove_cached(cache_dir, split, name):
+    stem = os.path.splitext(name)[0]
+    for path in (os.path.join(cache_dir, 'images', split, stem + '.jpg'),
+                 os.path.join(cache_dir, 'images', split, stem + '.npy'),
+                 os.path.join(cache_dir, 'labels', split, stem + '.txt')):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def stratum(name, dart_count):
+    """
+    Images are stratified by capture session (the file name prefix, e.g. 'd1' or '0018', which
+    groups a camera/board setup) and by how many darts are labelled.
+    """
+    session = name.replace(' ', '_').split('_')[0]
+    return session, dart_count
+
+
+def _name_hash(name):
+    return hashlib.sha1(name.encode()).hexdigest()
+
+
+def assign_splits(entries, fractions=(0.8, 0.1, 0.1), previous=None):
+    """
+    Deterministic stratified split that stays put as the folder changes. Images already in the
+    `previous` manifest keep their split, so adding, removing or relabelling files never moves
+    another image between train/val/test. New images are taken in name-hash order and each goes to
+    the split furthest below its share of the image's stratum, so every stratum is split in the
+    given proportions. Changing `fractions` only affects images placed from then on.
+    """
+    previous = previous or {}
+    strata = defaultdict(list)
+    for name, entry in entries.items():
+        strata[stratum(name, entry['darts'])].append(name)
+
+    shares = np.asarray(fractions, dtype=float) / np.sum(fractions)
+    splits = {}
+    for names in strata.values():
+        counts = np.zeros(len(SPLITS))
+        new = []
+        for name in names:
+            split = previous.get(name, {}).get('split')
+            if split in SPLITS:
+                splits[name] = split
+                counts[SPLITS.index(split)] += 1
+            else:
+                new.append(name)
+        for name in sorted(new, key=_name_hash):
+            index = int(np.argmax(shares * (counts.sum() + 1) - counts))
+            splits[name] = SPLITS[index]
+            counts[index] += 1
+    return splits
+
+
+def prepare_dataset(data_dir, cache_dir, img_size=640, fractions=(0.8, 0.1, 0.1), label_dir=None, workers=None):
+    """
+    Build (or bring up to date) a resized, split copy of the flat `data_dir` image folder in
+    cache_dir/images|labels/<split>. Hashing and resizing run on a process pool; only images whose
+    content or label changed or that were cached at another img_size are
+    processed again. Images keep the split they were first given (see assign_splits). Returns the manifest (name -> hash, split, cached shape).
+    """
+    names = sorted(name for name in os.listdir(data_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+    sources = {name: (os.path.join(data_dir, name), find_label(os.path.join(data_dir, name), label_dir)) for name in names}
+
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers or os.cpu_count()) as pool:
+        hashes = pool.map(_hash_file, [sources[name] for name in names], chunksize=8)
+        entries = {name: {'hash': digest, 'darts': dart_count} for name, (digest, dart_count) in zip(names, hashes)}
+        splits = assign_splits(entries, fractions, previous)
+
+        jobs, stale = [], []
+        for name, entry in entries.items():
+            entry['split'] = splits[name]
+            old = previous.get(name)
+            cached = os.path.join(cache_dir, 'images', entry['split'], os.path.splitext(name)[0] + '.jpg')
+            if old is not None and old['hash'] == entry['hash'] and old['split'] == entry['split'] and old.get('img_size') == img_size and os.path.exists(cached):
+                entry['img_size'], entry['shape'] = old['img_size'], old['shape']
+                continue
+            if old is not None:
+                stale.append((old['split'], name))
+            jobs.append((name, (*sources[name], cached, img_size)))
+
+        for name in set(previous) - set(entries): # source image deleted
+            stale.append((previous[name]['split'], name))
+        for split, name in stale:
+            _remove_cached(cache_dir, split, name)
+
+        shapes = pool.map(_resize_into_cache, [job for _, job in jobs], chunksize=4)
+
+    for (name, _), shape in zip(jobs, shapes):
+        if shape is None:
+            print(f"Skipping unreadable image {name}")
+            del entries[name]
+            continue
+        entries[name]['img_size'], entries[name]['shape'] = img_size, shape
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(entries, f, indent=1)
+    os.replace(temp_path, manifest_path)
+
+    counts = {split: sum(entry['split'] == split for entry in entries.values()) for split in SPLITS}
+    print(f"Prepared {len(entries)} images in {cache_dir} ({len(jobs)} processed, {len(entries) - len(jobs)} reused): "
+          + ', '.join(f"{split}={count}" for split, count in counts.items()))
+    return entries
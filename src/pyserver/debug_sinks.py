@@ -0,0 +1,166 @@
+import queue
+import threading
+import cv2
+import numpy as np
+
+
+class DebugChannel:
+    """
+    Side channel that carries debug events from the scoring loop to optional sinks.
+    Publishing never blocks: if the sinks fall behind, events are dropped instead of
+    slowing down the loop.
+
+    Sinks with gui=True (HighGUI windows) don't run on the sink thread. HighGUI isn't thread-safe
+    and some backends (Qt, macOS) only work from one thread, so only the newest event of each kind
+    is kept for them, and the scoring loop hands it over with pump_gui() on its own thread, the one
+    that draws the GUI.
+    """
+    def __init__(self, sinks, maxsize=4):
+        self.sinks = list(sinks)
+        self.events_dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._thread_sinks = [sink for sink in self.sinks if not sink.gui]
+        self._gui_sinks = [sink for sink in self.sinks if sink.gui]
+        self._mailbox = {} # kind -> newest payload for the GUI sinks
+        self._mailbox_lock = threading.Lock()
+
+    def wants(self, kind, frame_index=None):
+        """Whether any sink takes this event; check before building an expensive payload"""
+        return any(sink.wants(kind, frame_index) for sink in self.sinks)
+
+    def publish(self, kind, **payload):
+        # sinks that skip this event (e.g. all but every Nth frame) are filtered out here, so skipped
+        # events never take up a queue slot
+        frame_index = payload.get('frame_index')
+        if any(sink.wants(kind, frame_index) for sink in self._gui_sinks):
+            with self._mailbox_lock:
+                if kind in self._mailbox:
+                    self.events_dropped += 1 # replaced before pump_gui() got to it
+                self._mailbox[kind] = payload
+        if any(sink.wants(kind, frame_index) for sink in self._thread_sinks):
+            try:
+                self._queue.put_nowait((kind, payload))
+            except queue.Full:
+                self.events_dropped += 1
+
+    def pump_gui(self):
+        """Hand the newest events to the GUI sinks; call from the thread that owns the windows"""
+        if not self._gui_sinks:
+            return
+        with self._mailbox_lock:
+            events, self._mailbox = self._mailbox, {}
+        for kind, payload in events.items():
+            for sink in self._gui_sinks:
+                if sink.wants(kind, payload.get('frame_index')):
+                    sink.handle(kind, payload)
+
+    def start(self):
+        if self._thread is None and self._thread_sinks:
+            self._thread = threading.Thread(target=self._run, name="debug-sinks", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=1.0):
+        if self._thread is not None:
+            try:
+                self._queue.put((None, None), timeout=timeout) # sentinel, waits briefly for the sink thread to catch up
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        for sink in self.sinks:
+            sink.close()
+        with self._mailbox_lock:
+            self._mailbox = {}
+
+    def _run(self):
+        while True:
+            kind, payload = self._queue.get()
+            if kind is None:
+                break
+            for sink in self._thread_sinks:
+                if sink.wants(kind, payload.get('frame_index')):
+                    sink.handle(kind, payload)
+
+
+class DebugSink:
+    kinds = ()
+    gui = False # True for sinks that call HighGUI, see DebugChannel
+
+    def wants(self, kind, frame_index=None):
+        return kind in self.kinds
+
+    def handle(self, kind, payload):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RawFeedSink(DebugSink):
+    """Shows the raw camera feed; pressing 'q' in the window calls on_quit"""
+    kinds = ('frame',)
+    gui = True
+
+    def __init__(self, on_quit=None, window_name='Raw Camera Feed'):
+        self.on_quit = on_quit
+        self.window_name = window_name
+
+    def handle(self, kind, payload):
+        cv2.imshow(self.window_name, payload['frame'])
+        if cv2.waitKey(1) & 0xFF == ord('q') and self.on_quit is not None:
+            self.on_quit()
+
+    def close(self):
+        try:
+            cv2.destroyWindow(self.window_name)
+        except cv2.error:
+            pass # window was never opened
+
+
+class DetectionLogSink(DebugSink):
+    """Prints what YOLO is detecting every `every` frames, and calibration lock/unlock events"""
+    kinds = ('detections', 'calibration')
+    class_names = {0: '20', 1: '3', 2: '11', 3: '6', 4: 'dart'}
+    point_names = ['20', '3', '11', '6', '9', '15'] # based on the calibration indices
+
+    def __init__(self, every=30):
+        self.every = every
+
+    def wants(self, kind, frame_index=None):
+        if kind == 'detections':
+            return frame_index is None or frame_index % self.every == 0
+        return kind in self.kinds
+
+    def handle(self, kind, payload):
+        if kind == 'calibration':
+            details = ', '.join(f"{k}={v}" for k, v in payload.items() if k != 'event' and v is not None)
+            print(f"Calibration {payload['event']}" + (f" ({details})" if details else ""))
+        else:
+            self._debug_detections(payload['result'], payload['calibration_coords'])
+
+    def _debug_detections(self, result, calibration_coords):
+        classes = result.boxes.cls
+        boxes = result.boxes.xywhn
+        conf = result.boxes.conf
+
+        print(f"=== Frame Debug ===")
+        print(f"Total detections: {len(classes)}")
+
+        for i in range(len(classes)):
+            class_id = int(classes[i].item())
+            confidence = conf[i].item()
+            box = boxes[i]
+            class_name = self.class_names.get(class_id, 'unknown')
+
+            print(f"  Detection {i}: Class={class_name} ({class_id}), Conf={confidence:.3f}, Box=[{box[0]:.3f}, {box[1]:.3f}]")
+
+        # Show calibration status
+        valid_calibration_points = np.sum(np.all(calibration_coords != -1, axis=1))
+        print(f"Valid calibration points: {valid_calibration_points}/6")
+
+        for i, coord in enumerate(calibration_coords):
+            status = "FOUND" if not np.all(coord == -1) else "MISSING"
+            print(f"  {self.point_names[i]}: {status} - {coord}")
+
+        print("==================")
@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import json
+from collections import OrderedDict
+from websockets.exceptions import ConnectionClosed
+
+
+class ClientChannel:
+    """
+    Bounded per-client send queue.
+
+    policy 'drop_oldest': when the queue is full the oldest queued message is dropped.
+    policy 'coalesce': a message published with a key replaces any queued message with the same key
+    (e.g. the latest state supersedes an unsent older state); otherwise falls back to drop_oldest.
+    """
+    def __init__(self, client_id, websocket, maxsize, policy, encoding='json'):
+        self.id = client_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.maxsize = maxsize
+        self.policy = policy
+        self.remote_address = getattr(websocket, 'remote_address', None)
+        self._queue = OrderedDict() # sequence number -> (key, payload)
+        self._keys = {} # key -> sequence number of the queued message with that key
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflows_since_send = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def offer(self, payload, key=None):
+        if self.policy == 'coalesce' and key is not None and key in self._keys:
+            seq = self._keys[key]
+            self._queue[seq] = (key, payload) # replace in place, keeps its position in the queue
+            self.coalesced += 1
+            return
+
+        if len(self._queue) >= self.maxsize:
+            _, (old_key, _) = self._queue.popitem(last=False)
+            if old_key is not None:
+                self._keys.pop(old_key, None)
+            self.dropped += 1
+            self.overflows_since_send += 1
+
+        seq = next(self._seq)
+        self._queue[seq] = (key, payload)
+        if key is not None:
+            self._keys[key] = seq
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._wakeup.set()
+
+    async def next_message(self):
+        while not self._queue:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        _, (key, payload) = self._queue.popitem(last=False)
+        if key is not None:
+            self._keys.pop(key, None)
+        return payload
+
+    def stats(self):
+        return {
+            'id': self.id,
+            'remote_address': str(self.remote_address),
+            'encoding': self.encoding,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+
+class FanoutHub:
+    """
+    Fans messages out to websocket clients. Each message is serialised once per encoding in use
+    (`encoders` maps encoding names to functions, json by default) and offered to every
+    client's bounded ClientChannel; a writer task per client drains its channel. Clients that keep
+    overflowing their queue (more than `max_overflows` drops since their last successful send) or
+    that take longer than `send_timeout` seconds to accept a message are evicted.
+    """
+    def __init__(self, queue_size=64, policy='drop_oldest', max_overflows=256, send_timeout=5.0, encoders=None):
+        if policy not in ('drop_oldest', 'coalesce'):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_overflows = max_overflows
+        self.send_timeout = send_timeout
+        self.encoders = encoders if encoders is not None else {'json': lambda message: json.dumps(message, separators=(',', ':'))}
+        self.channels = {}
+        self.evicted = 0
+        self.published = 0
+        self.dropped = 0 # across all clients, including ones that have since disconnected
+        self._ids = itertools.count()
+
+    def serialize(self, message, encoding, cache=None):
+        if isinstance(message, (str, bytes)):
+            return message
+        if cache is None:
+            return self.encoders[encoding](message)
+        if encoding not in cache:
+            cache[encoding] = self.encoders[encoding](message)
+        return cache[encoding]
+
+    def publish(self, message, key=None):
+        payloads = {} # encoding -> serialised message
+        self.published += 1
+        for channel in list(self.channels.values()):
+            self._offer(channel, self.serialize(message, channel.encoding, payloads), key)
+            if channel.overflows_since_send > self.max_overflows:
+                self._evict(channel, "send queue overflow")
+
+    def send_to(self, websocket_or_channel, message, key=None):
+        """Queue a message for a single client (e.g. a snapshot on connect)"""
+        channel = websocket_or_channel if isinstance(websocket_or_channel, ClientChannel) else self._channel_for(websocket_or_channel)
+        if channel is not None:
+            self._offer(channel, self.serialize(message, channel.encoding), key)
+
+    def _offer(self, channel, payload, key):
+        dropped = channel.dropped
+        channel.offer(payload, key)
+        self.dropped += channel.dropped - dropped
+
+    def _channel_for(self, websocket):
+        for channel in self.channels.values():
+            if channel.websocket is websocket:
+                return channel
+        return None
+
+    def _evict(self, channel, reason):
+        if self.channels.pop(channel.id, None) is None:
+            return
+        self.evicted += 1
+        asyncio.ensure_future(channel.websocket.close(code=1013, reason=f"evicted: {reason}"))
+
+    async def _writer(self, channel):
+        while channel.id in self.channels:
+            payload = await channel.next_message()
+            try:
+                await asyncio.wait_for(channel.websocket.send(payload), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(channel, "send timeout")
+                return
+            except ConnectionClosed:
+                return
+            channel.sent += 1
+            channel.overflows_since_send = 0
+
+    def register(self, websocket, encoding='json'):
+        if encoding not in self.encoders:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        channel = ClientChannel(next(self._ids), websocket, self.queue_size, self.policy, encoding)
+        self.channels[channel.id] = channel
+        return channel
+
+    async def serve_client(self, websocket, on_connect=None, on_message=None, encoding='json'):
+        """
+        Run a client connection until it closes. on_connect(channel) can queue initial messages,
+        on_message(channel, message) handles messages sent by the client.
+        """
+        channel = self.register(websocket, encoding)
+        writer = asyncio.create_task(self._writer(channel))
+        try:
+            if on_connect is not None:
+                await on_connect(channel)
+            async for message in websocket:
+                if on_message is not None:
+                    await on_message(channel, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.channels.pop(channel.id, None)
+            writer.cancel()
+
+    def stats(self):
+        """Per-client send-queue depth and delivery counters"""
+        return [channel.stats() for channel in self.channels.values()]
+
+    def max_queue_depth(self):
+        """Deepest send queue among the connected clients"""
+        return max((stats['depth'] for stats in self.stats()), default=0)
+
+    def total_queue_depth(self):
+        return sum(stats['depth'] for stats in self.stats())
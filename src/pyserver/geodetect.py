@@ -2,10 +2,26 @@ import cv2
 import numpy as np
 import json
 import os
+import sys
 import keyboard
+from calibration_profiles import ProfileStore
+from camera_discovery import CameraDiscovery
 
 class SimpleDartboardDetector:
-    def __init__(self):
+    def __init__(self, fast=False, pyramid_levels=2, search_margin=1.3, verbose=None, camera_id=None, profiles=None):
+        """
+        fast: real-time mode. The board is first found on a downscaled pyramid level, then refined
+        at full resolution only inside a window around that estimate; once locked (last_detection
+        set) only the window around the last board is searched, falling back to the coarse search
+        when the board is lost.
+        pyramid_levels: number of pyrDown halvings for the coarse search.
+        search_margin: half-size of the search window as a multiple of the board radius.
+        verbose: print per-frame debug lines, on by default outside fast mode.
+        camera_id / profiles: the detector parameters are kept in the calibration profile of the camera
+        with this FrameSource.identity (the key VideoProcessing uses too), in `profiles` or
+        calibration_profiles.json by default. The old dartboard_settings.json is read as the defaults
+        for a camera without a profile; without a camera_id it is where the settings are kept.
+        """
         self.dartboard_center = None
         self.dartboard_radius = None
         
@@ -15,8 +31,23 @@ class SimpleDartboardDetector:
         self.stable_detections = []  # Store last few good detections
         self.max_stable = 3
         
-        # Settings file path
+        # Fast mode settings
+        self.fast = fast
+        self.pyramid_levels = pyramid_levels
+        self.search_margin = search_margin
+        self.verbose = not fast if verbose is None else verbose
+        
+        # Structuring elements never change, so build them once (per scale for the coarse search)
+        self.kernels = {scale: self._build_kernels(scale) for scale in {1, 2 ** pyramid_levels}}
+        self.debug_kernels = (cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)),
+                              cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (15, 15)))
+        
+        # Settings: per-camera profile, falling back to the legacy global settings file
         self.settings_file = 'dartboard_settings.json'
+        self.camera_id = camera_id
+        if profiles is None and camera_id is not None:
+            profiles = ProfileStore()
+        self.profiles = profiles
         
         # Adjustable parameters for dartboard detection (defaults)
         self.color_diff_threshold = 30  # Color difference threshold (adjustable with arrow keys)
@@ -31,115 +62,161 @@ class SimpleDartboardDetector:
         self.load_settings()
     
     def load_settings(self):
-        """Load settings from JSON file"""
+        """Load settings from the camera's profile, or from the legacy JSON file"""
         try:
-            if os.path.exists(self.settings_file):
+            settings = self.profiles.get(self.camera_id, 'detector') if self.profiles is not None else None
+            if settings is None and os.path.exists(self.settings_file):
                 with open(self.settings_file, 'r') as f:
                     settings = json.load(f)
-                    self.color_diff_threshold = settings.get('color_diff_threshold', 30)
-                    self.brightness_adjust = settings.get('brightness_adjust', 0)
-                    self.contrast_adjust = settings.get('contrast_adjust', 1.0)
-                    self.center_offset_x = settings.get('center_offset_x', 0)
-                    self.center_offset_y = settings.get('center_offset_y', 0)
-                    print(f"Loaded settings: Color Diff={self.color_diff_threshold}, Brightness={self.brightness_adjust}, Contrast={self.contrast_adjust:.2f}, Offset=({self.center_offset_x}, {self.center_offset_y})")
+            if settings is not None:
+                self.color_diff_threshold = settings.get('color_diff_threshold', 30)
+                self.brightness_adjust = settings.get('brightness_adjust', 0)
+                self.contrast_adjust = settings.get('contrast_adjust', 1.0)
+                self.center_offset_x = settings.get('center_offset_x', 0)
+                self.center_offset_y = settings.get('center_offset_y', 0)
+                print(f"Loaded settings: Color Diff={self.color_diff_threshold}, Brightness={self.brightness_adjust}, Contrast={self.contrast_adjust:.2f}, Offset=({self.center_offset_x}, {self.center_offset_y})")
         except Exception as e:
             print(f"Error loading settings: {e}. Using defaults.")
     
     def save_settings(self):
-        """Save current settings to JSON file"""
+        """Save current settings to the camera's profile (written to disk debounced, in the background), or the JSON file"""
+        settings = {
+            'color_diff_threshold': self.color_diff_threshold,
+            'brightness_adjust': self.brightness_adjust,
+            'contrast_adjust': self.contrast_adjust,
+            'center_offset_x': self.center_offset_x,
+            'center_offset_y': self.center_offset_y
+        }
+        if self.profiles is not None:
+            self.profiles.update(self.camera_id, detector=settings)
+            return
         try:
-            settings = {
-                'color_diff_threshold': self.color_diff_threshold,
-                'brightness_adjust': self.brightness_adjust,
-                'contrast_adjust': self.contrast_adjust,
-                'center_offset_x': self.center_offset_x,
-                'center_offset_y': self.center_offset_y
-            }
             with open(self.settings_file, 'w') as f:
                 json.dump(settings, f, indent=2)
         except Exception as e:
             print(f"Error saving settings: {e}")
         
-    def detect_dartboard(self, frame):
+    def _debug(self, message):
+        if self.verbose:
+            print(f"Debug: {message}")
+    
+    @staticmethod
+    def _build_kernels(downscale):
+        """Open/close kernels for a pyramid level, 7x7 and 20x20 at full resolution"""
+        small = max(3, round(7 / downscale))
+        large = max(3, round(20 / downscale))
+        return (cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (small, small)),
+                cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (large, large)))
+    
+    def _difference_mask(self, gray, downscale=1):
         """
-        Detect dartboard by finding areas with significant color difference from background
+        Mask of the areas that differ significantly from the background colour, sampled from the
+        borders of `gray`. `downscale` selects the kernels for a pyramid level.
         """
-        # Convert to grayscale for processing
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
         # Apply brightness and contrast adjustments
         adjusted = cv2.convertScaleAbs(gray, alpha=self.contrast_adjust, beta=self.brightness_adjust)
         
-        # Noise reduction
-        blurred = cv2.GaussianBlur(adjusted, (7, 7), 1.5)
+        # Noise reduction (pyrDown has already low-passed the coarse levels)
+        blurred = cv2.GaussianBlur(adjusted, (7, 7), 1.5) if downscale == 1 else adjusted
         blurred = cv2.bilateralFilter(blurred, 5, 50, 50)
         
         # Calculate background color by sampling border regions
         h, w = blurred.shape
-        border_width = min(50, w//10)  # Sample from border
-        border_height = min(50, h//10)
+        border_width = min(50 // downscale, w//10)  # Sample from border
+        border_height = min(50 // downscale, h//10)
         
-        # Sample from all four borders
-        top_border = blurred[0:border_height, :]
-        bottom_border = blurred[h-border_height:h, :]
-        left_border = blurred[:, 0:border_width]
-        right_border = blurred[:, w-border_width:w]
-        
-        # Calculate average background color
-        border_pixels = np.concatenate([
-            top_border.flatten(),
-            bottom_border.flatten(), 
-            left_border.flatten(),
-            right_border.flatten()
-        ])
-        background_avg = np.mean(border_pixels)
+        # Average of all four borders
+        background_avg = np.mean(np.concatenate([
+            blurred[0:border_height, :].ravel(),
+            blurred[h-border_height:h, :].ravel(),
+            blurred[:, 0:border_width].ravel(),
+            blurred[:, w-border_width:w].ravel()
+        ]))
         
-        print(f"Debug: Background average: {background_avg:.1f}")
-        
-        # Create mask for areas that differ significantly from background
-        diff_from_bg = np.abs(blurred.astype(np.float32) - background_avg)
-        diff_mask = (diff_from_bg > self.color_diff_threshold).astype(np.uint8) * 255
+        # Areas that differ significantly from background, |blurred - background| > threshold
+        diff_mask = ((blurred > background_avg + self.color_diff_threshold) |
+                     (blurred < background_avg - self.color_diff_threshold)).astype(np.uint8) * 255
         
         # More aggressive morphological operations to reduce false positives
-        kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
-        kernel_large = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (20, 20))
-        
-        # Fill gaps and remove noise - more aggressive cleanup
+        kernel_small, kernel_large = self.kernels[downscale]
         diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel_small)  # Remove small noise first
         diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_CLOSE, kernel_large)  # Fill dartboard gaps
         diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel_small)  # Clean up again
         
         # Final noise reduction
-        diff_mask = cv2.medianBlur(diff_mask, 5)
+        diff_mask = cv2.medianBlur(diff_mask, 5 if downscale == 1 else 3)
+        return diff_mask, background_avg
+    
+    def _measure(self, gray, window=None, downscale=1, stride=1):
+        """
+        Centre of mass and 90th percentile radius of the difference mask, in full-resolution pixels,
+        or None when too few pixels differ from the background. `window` = (x0, y0, x1, y1) limits
+        the search to that part of `gray`; the radius percentile is taken over every `stride`-th
+        pixel in each direction.
+        """
+        x0, y0 = 0, 0
+        if window is not None:
+            x0, y0, x1, y1 = window
+            gray = gray[y0:y1, x0:x1]
+        diff_mask, background_avg = self._difference_mask(gray, downscale)
         
         # Find the center of mass of the detected dartboard area
-        diff_pixels = np.where(diff_mask > 0)
-        
-        print(f"Debug: Found {len(diff_pixels[0])} different pixels in mask")
+        moments = cv2.moments(diff_mask, binaryImage=True)
+        pixel_count = moments['m00']
+        self._debug(f"Background average: {background_avg:.1f}, found {int(pixel_count)} different pixels in mask (scale 1/{downscale})")
+        
+        if pixel_count <= 1000 / downscale ** 2:  # Need sufficient pixels for dartboard
+            return None
+        com_x = moments['m10'] / pixel_count
+        com_y = moments['m01'] / pixel_count
+        
+        # Use 90th percentile of the distances from the centre for the radius to avoid outliers
+        y_coords, x_coords = np.nonzero(diff_mask[::stride, ::stride])
+        distances = np.hypot(x_coords * stride - int(com_x), y_coords * stride - int(com_y))
+        base_radius = np.percentile(distances, 90)
+        return int((x0 + com_x) * downscale), int((y0 + com_y) * downscale), int(base_radius * downscale)
+    
+    def _search_window(self, shape, center_x, center_y, radius):
+        """Full-resolution window around a board estimate, clipped to the frame"""
+        half = int(radius * self.search_margin) + 8
+        h, w = shape[:2]
+        return max(0, center_x - half), max(0, center_y - half), min(w, center_x + half), min(h, center_y + half)
+    
+    def _fast_measure(self, gray):
+        if self.last_detection is not None:
+            # Locked: only look around the last board position
+            measurement = self._measure(gray, self._search_window(gray.shape, *self.last_detection), stride=2)
+            if measurement is not None:
+                return measurement
+            self._debug("Board lost in search window, falling back to full search")
+        
+        # Coarse search on a downscaled pyramid level, then refine at full resolution around it
+        small = gray
+        for _ in range(self.pyramid_levels):
+            small = cv2.pyrDown(small)
+        coarse = self._measure(small, downscale=2 ** self.pyramid_levels)
+        if coarse is None:
+            return None
+        return self._measure(gray, self._search_window(gray.shape, *coarse), stride=2)
+    
+    def detect_dartboard(self, frame):
+        """
+        Detect dartboard by finding areas with significant color difference from background
+        """
+        # Convert to grayscale for processing
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        measurement = self._fast_measure(gray) if self.fast else self._measure(gray)
         
-        if len(diff_pixels[0]) > 1000:  # Need sufficient pixels for dartboard
-            y_coords, x_coords = diff_pixels
-            
-            # Calculate center of mass
-            com_x = int(np.mean(x_coords))
-            com_y = int(np.mean(y_coords))
-            
-            # Estimate radius by finding distances from center
-            distances = np.sqrt((x_coords - com_x)**2 + (y_coords - com_y)**2)
-            
-            # Use 90th percentile for radius to avoid outliers
-            base_radius = int(np.percentile(distances, 90))
+        if measurement is not None:
+            com_x, com_y, base_radius = measurement
             radius = int(base_radius * 0.95)  # Smaller buffer to avoid oversizing
             
-            print(f"Debug: Center=({com_x}, {com_y}), Base Radius={base_radius}, Final Radius={radius}")
-            print(f"Debug: Frame size=({frame.shape[1]}, {frame.shape[0]})")
+            self._debug(f"Center=({com_x}, {com_y}), Base Radius={base_radius}, Final Radius={radius}, Frame size=({frame.shape[1]}, {frame.shape[0]})")
             
             # Ensure radius is reasonable for a dartboard
             max_radius = min(350, frame.shape[1]//2.2, frame.shape[0]//2.2)
             radius = max(80, min(radius, max_radius))
             
-            print(f"Debug: Adjusted radius to {radius}")
-            
             # Validate position - be more lenient
             margin = 10  # Smaller margin
             frame_width = frame.shape[1]
@@ -150,13 +227,9 @@ class SimpleDartboardDetector:
             y_valid = margin < com_y < frame_height - margin
             radius_valid = radius > 50 and radius < min(frame_width//2, frame_height//2) - margin
             
-            print(f"Debug: Validation - X: {x_valid} ({margin} < {com_x} < {frame_width - margin})")
-            print(f"Debug: Validation - Y: {y_valid} ({margin} < {com_y} < {frame_height - margin})")
-            print(f"Debug: Validation - R: {radius_valid} (50 < {radius} < {min(frame_width//2, frame_height//2) - margin})")
+            self._debug(f"Adjusted radius to {radius}, validation - X: {x_valid}, Y: {y_valid}, R: {radius_valid}")
             
             if x_valid and y_valid and radius_valid:
-                
-                print(f"Debug: Detection successful - final coords ({com_x}, {com_y}, {radius})")
                 x, y, r = int(com_x), int(com_y), int(radius)
                 
                 # Light smoothing with previous detection
@@ -178,9 +251,10 @@ class SimpleDartboardDetector:
                 self.dartboard_radius = int(r)
                 self.detection_count += 1
                 
+                self._debug(f"Detection successful - final coords ({final_x}, {final_y}, {r})")
                 return (final_x, final_y), r
             else:
-                print(f"Debug: Validation failed - clearing previous detection")
+                self._debug("Validation failed - clearing previous detection")
         
         # Clear previous detection if validation fails
         self.dartboard_center = None
@@ -320,8 +394,7 @@ class SimpleDartboardDetector:
         diff_from_bg = np.abs(blurred.astype(np.float32) - background_avg)
         diff_mask = (diff_from_bg > self.color_diff_threshold).astype(np.uint8) * 255
         
-        kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        kernel_large = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (15, 15))
+        kernel_small, kernel_large = self.debug_kernels
         
         diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_CLOSE, kernel_small)
         diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel_small)
@@ -371,11 +444,10 @@ class SimpleDartboardDetector:
         self.save_settings()
 
 if __name__ == "__main__":
-    # Test the detector
-    detector = SimpleDartboardDetector()
-    
-    # Initialize webcam
-    cap = cv2.VideoCapture(0)
+    # Test the detector, pass --fast for the real-time pyramid/ROI mode
+    # Initialize webcam, found the same way as the scoring pipeline so both share its profile
+    source = CameraDiscovery().open()
+    detector = SimpleDartboardDetector(fast='--fast' in sys.argv, camera_id=source.identity)
     
     print("Simple Dartboard Detector")
     print("Press 'q' to quit, 'd' to toggle debug mask")
@@ -386,7 +458,7 @@ if __name__ == "__main__":
     
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, _ = source.read()
             if not ret:
                 continue
             
@@ -440,5 +512,6 @@ if __name__ == "__main__":
                 detector.adjust_center_y(1)
     
     finally:
-        cap.release()
+        source.release()
         cv2.destroyAllWindows()
+        detector.profiles.close()
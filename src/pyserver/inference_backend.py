@@ -0,0 +1,136 @@
+import os
+import shutil
+import cv2
+import numpy as np
+import yaml
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+CLASS_NAMES = ['20', '3', '11', '6', 'dart']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _exported_path(weights, backend, int8):
+    stem = os.path.splitext(weights)[0]
+    suffix = '_int8' if int8 else ''
+    if backend == 'onnx':
+        return f"{stem}{suffix}.onnx"
+    return f"{stem}{suffix}_openvino_model"
+
+
+def _is_stale(exported, weights):
+    return not os.path.exists(exported) or os.path.getmtime(exported) < os.path.getmtime(weights)
+
+
+def exported_input_size(exported, backend):
+    """(height, width) an exported model takes, read from the model itself; None for dynamic shapes"""
+    if backend == 'onnx':
+        import onnxruntime
+        shape = onnxruntime.InferenceSession(exported, providers=['CPUExecutionProvider']).get_inputs()[0].shape
+        height, width = shape[2:4]
+    else:
+        metadata = os.path.join(exported, 'metadata.yaml') # written by ultralytics next to the OpenVINO IR
+        if not os.path.exists(metadata):
+            return None
+        with open(metadata) as f:
+            height, width = (yaml.safe_load(f) or {}).get('imgsz', (None, None))
+    if not isinstance(height, int) or not isinstance(width, int):
+        return None
+    return height, width
+
+
+def _calibration_yaml(calibration_dir, export_dir):
+    """Dataset config that points ultralytics' INT8 calibration at a flat folder of images"""
+    config = {'path': os.path.abspath(calibration_dir), 'train': '.', 'val': '.', 'nc': len(CLASS_NAMES), 'names': CLASS_NAMES}
+    yaml_path = os.path.join(export_dir, 'int8_calibration.yaml')
+    with open(yaml_path, 'w') as f:
+        yaml.dump(config, f, default_flow_style=False)
+    return yaml_path
+
+
+def _letterbox(image, imgsz):
+    """Resize keeping aspect ratio and pad to imgsz square, as the exported model expects"""
+    h, w = image.shape[:2]
+    scale = imgsz / max(h, w)
+    resized = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    padded = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - resized.shape[0]) // 2, (imgsz - resized.shape[1]) // 2
+    padded[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return padded
+
+
+class ImageCalibrationReader:
+    """onnxruntime calibration data reader feeding letterboxed images from a folder"""
+    def __init__(self, image_dir, input_name, imgsz, limit=100):
+        names = sorted(name for name in os.listdir(image_dir) if name.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+        self._paths = iter(os.path.join(image_dir, name) for name in names)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self._paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            rgb = cv2.cvtColor(_letterbox(image, self.imgsz), cv2.COLOR_BGR2RGB)
+            tensor = rgb.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: tensor}
+        return None
+
+
+def _quantize_onnx(fp32_path, int8_path, calibration_dir, imgsz):
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    reader = ImageCalibrationReader(calibration_dir, input_name, imgsz)
+    quantize_static(fp32_path, int8_path, reader, quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def export_model(weights="weights.pt", backend='onnx', int8=False, calibration_dir="training_data", imgsz=640):
+    """
+    Export the PyTorch weights to ONNX or OpenVINO, optionally INT8-quantised with calibration on
+    calibration_dir. Exports are cached next to the weights and only redone when the weights change
+    or the cached export was made for another imgsz. Returns the path of the exported model.
+    """
+    if backend not in ('onnx', 'openvino'):
+        raise ValueError(f"Cannot export to backend: {backend}")
+    exported = _exported_path(weights, backend, int8)
+    if not _is_stale(exported, weights) and exported_input_size(exported, backend) in (None, (imgsz, imgsz)):
+        return exported
+
+    from ultralytics import YOLO # imported lazily, the torch import dominates start-up
+    if backend == 'onnx':
+        if int8:
+            _quantize_onnx(export_model(weights, 'onnx', False, calibration_dir, imgsz), exported, calibration_dir, imgsz)
+        else:
+            path = YOLO(weights).export(format='onnx', imgsz=imgsz)
+            if os.path.abspath(path) != os.path.abspath(exported):
+                os.replace(path, exported)
+    else:
+        export_dir = os.path.dirname(os.path.abspath(weights))
+        data = _calibration_yaml(calibration_dir, export_dir) if int8 else None
+        path = YOLO(weights).export(format='openvino', imgsz=imgsz, int8=int8, data=data)
+        if os.path.abspath(path) != os.path.abspath(exported):
+            if os.path.exists(exported):
+                shutil.rmtree(exported)
+            os.replace(path, exported)
+    return exported
+
+
+def load_model(weights="weights.pt", backend='torch', int8=False, calibration_dir="training_data", imgsz=640):
+    """
+    Load the dart model for the configured backend. Every backend is returned as an ultralytics YOLO
+    object, so it is called and post-processed exactly like the PyTorch model. Exported models have a
+    fixed input size, which must match imgsz (VideoProcessing.imgsz).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    from ultralytics import YOLO
+    if backend == 'torch':
+        return YOLO(weights)
+    exported = export_model(weights, backend, int8, calibration_dir, imgsz)
+    size = exported_input_size(exported, backend)
+    if size is not None and size != (imgsz, imgsz):
+        raise ValueError(f"{exported} takes {size[1]}x{size[0]} input, expected imgsz={imgsz}")
+    return YOLO(exported, task='detect')
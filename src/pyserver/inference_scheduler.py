@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """
+    Collects frames submitted by several boards and runs them through one shared model in batches.
+
+    A batch is dispatched when `max_batch` frames are waiting or `max_wait` seconds after the first
+    frame of the batch arrived, whichever comes first. Calling the scheduler like a model blocks until
+    that frame's result is ready, so it can be passed to VideoProcessing(model=...) in place of a YOLO
+    instance. Once stopped, waiting and newly submitted frames fail with RuntimeError instead of
+    blocking their callers forever.
+    """
+    def __init__(self, model, max_batch=8, max_wait=0.01):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._requests = queue.Queue()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock() # orders submits against the drain in stop()
+        self.batches = 0
+        self.frames = 0
+
+    def submit(self, frame):
+        future = Future()
+        with self._lock:
+            if self._stop_event.is_set():
+                future.set_exception(RuntimeError("Inference scheduler is stopped"))
+            else:
+                self._requests.put((frame, future))
+        return future
+
+    def __call__(self, frame, verbose=False):
+        return [self.submit(frame).result()]
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self._lock:
+            self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        while True: # fail whatever the worker didn't pick up, so no caller waits on it forever
+            try:
+                _, future = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+    def _collect_batch(self):
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            frames = [frame for frame, _ in batch]
+            try:
+                results = self.model(frames, verbose=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for index, (_, future) in enumerate(batch):
+                if index < len(results):
+                    future.set_result(results[index])
+                else:
+                    future.set_exception(RuntimeError(f"Model returned {len(results)} results for a batch of {len(batch)}"))
+            self.batches += 1
+            self.frames += len(batch)
+
+    @property
+    def mean_batch_size(self):
+        return self.frames / self.batches if self.batches else 0.0
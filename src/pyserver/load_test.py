@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import numpy as np
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from fanout_hub import FanoutHub
+
+
+def run_synthetic_server(host, port, rate, queue_size, policy):
+    """Stand-in for DartMonitorServer that publishes timestamped dart events at a fixed rate"""
+    async def main():
+        hub = FanoutHub(queue_size=queue_size, policy=policy)
+        async with serve(hub.serve_client, host, port):
+            seq = 0
+            while True:
+                hub.publish({'type': 'dart', 'ts': time.time(), 'seq': seq})
+                seq += 1
+                await asyncio.sleep(1 / rate)
+    asyncio.run(main())
+
+
+async def client(url, duration, latencies, counts, slow_delay, connect_timeout):
+    """Receive messages until `duration` elapses, recording delivery latency from each message's 'ts'"""
+    received = 0
+    try:
+        async with connect(url, open_timeout=connect_timeout, max_queue=None) as websocket:
+            deadline = time.time() + duration
+            while time.time() < deadline:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=max(0.01, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                now = time.time()
+                event = json.loads(message)
+                event = event.get('event', event) # protocol event messages wrap the pipeline event
+                if 'ts' in event:
+                    latencies.append(now - event['ts'])
+                received += 1
+                if slow_delay:
+                    await asyncio.sleep(slow_delay)
+        counts['completed'] += 1
+    except ConnectionClosed:
+        counts['closed_by_server'] += 1
+    except (OSError, asyncio.TimeoutError):
+        counts['connect_failed'] += 1
+    counts['messages'] += received
+
+
+async def run_clients(args):
+    latencies, slow_latencies = [], []
+    counts = {'completed': 0, 'closed_by_server': 0, 'connect_failed': 0, 'messages': 0}
+    slow_counts = dict(counts)
+    tasks = [client(args.url, args.duration, latencies, counts, 0, args.connect_timeout) for _ in range(args.clients)]
+    tasks += [client(args.url, args.duration, slow_latencies, slow_counts, args.slow_delay, args.connect_timeout) for _ in range(args.slow_clients)]
+    await asyncio.gather(*tasks)
+    return latencies, counts, slow_latencies, slow_counts
+
+
+def report(name, latencies, counts, num_clients, duration):
+    print(f"{name}: {num_clients} clients, {counts['completed']} completed, {counts['closed_by_server']} closed by server, {counts['connect_failed']} failed to connect")
+    if not latencies:
+        print("  no messages received")
+        return
+    ms = np.array(latencies) * 1000
+    print(f"  messages: {counts['messages']} ({counts['messages'] / max(1, num_clients) / duration:.1f}/s per client)")
+    print(f"  latency ms: p50 {np.percentile(ms, 50):.2f}, p95 {np.percentile(ms, 95):.2f}, p99 {np.percentile(ms, 99):.2f}, max {ms.max():.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Websocket fan-out load test")
+    parser.add_argument('--url', default='ws://localhost:8765')
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--slow-clients', type=int, default=0, help="clients that sleep --slow-delay after every message")
+    parser.add_argument('--slow-delay', type=float, default=0.5)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--connect-timeout', type=float, default=10.0)
+    parser.add_argument('--serve', action='store_true', help="start a synthetic event server in a child process instead of using a running DartMonitorServer")
+    parser.add_argument('--rate', type=float, default=30.0, help="events per second published by the synthetic server")
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--policy', default='drop_oldest', choices=['drop_oldest', 'coalesce'])
+    args = parser.parse_args()
+
+    server = None
+    if args.serve:
+        host, port = args.url.split('//')[1].split(':')
+        server = multiprocessing.Process(target=run_synthetic_server, args=(host, int(port), args.rate, args.queue_size, args.policy), daemon=True)
+        server.start()
+        time.sleep(1.0) # give the server time to bind
+
+    try:
+        latencies, counts, slow_latencies, slow_counts = asyncio.run(run_clients(args))
+    finally:
+        if server is not None:
+            server.terminate()
+
+    report("Clients", latencies, counts, args.clients, args.duration)
+    if args.slow_clients:
+        report("Slow clients", slow_latencies, slow_counts, args.slow_clients, args.duration)
+
+
+if __name__ == "__main__":
+    main()
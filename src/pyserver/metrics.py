@@ -0,0 +1,166 @@
+import time
+from bisect import bisect_left
+
+# latency bucket upper bounds in seconds, from sub-millisecond numpy stages up to slow CPU inference
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+class Counter:
+    """
+    Monotonic count. Either incremented on the hot path with inc(), or read from `func` at scrape
+    time for values that are already counted elsewhere (e.g. the capture buffer's drop count).
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=None, func=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.func = func
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, self.labels, self.func() if self.func is not None else self.value
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. observe() is a bisect and three additions, so it can stay on
+    permanently; cumulative bucket counts are only built when the metrics are rendered.
+    With keep_observations every value is also kept, for exact percentiles in benchmarks.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=None, buckets=LATENCY_BUCKETS, keep_observations=False):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.observations = [] if keep_observations else None
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if self.observations is not None:
+            self.observations.append(seconds)
+
+    def time(self):
+        """Context manager observing the time spent in its block"""
+        return _Timer(self)
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", {**self.labels, 'le': '+Inf' if bound == float('inf') else repr(bound)}, cumulative
+        yield f"{self.name}_sum", self.labels, self.sum
+        yield f"{self.name}_count", self.labels, self.count
+
+
+class MetricsRegistry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format. Metrics sharing a
+    name (e.g. one histogram per pipeline stage, distinguished by label) are rendered as one family.
+    Recording is not locked: every metric is written from a single thread (the vision thread) and
+    scrapes only read, so a scrape can at worst see a frame's update half applied.
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=None, func=None):
+        return self.register(Counter(name, help, labels, func))
+
+    def gauge(self, name, help, labels=None, func=None):
+        return self.register(Gauge(name, help, labels, func))
+
+    def histogram(self, name, help, labels=None, buckets=LATENCY_BUCKETS, keep_observations=False):
+        return self.register(Histogram(name, help, labels, buckets, keep_observations))
+
+    def render(self):
+        # the exposition format wants each metric's samples in one group, whatever order the
+        # label sets (e.g. one per board) were registered in
+        families = {}
+        for metric in self.metrics:
+            families.setdefault(metric.name, []).append(metric)
+        lines = []
+        for name, metrics in families.items():
+            lines.append(f"# HELP {name} {metrics[0].help}")
+            lines.append(f"# TYPE {name} {metrics[0].kind}")
+            for metric in metrics:
+                for sample_name, labels, value in metric.samples():
+                    lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class PipelineMetrics:
+    """
+    Metrics recorded by VideoProcessing, see its start() loop for where each one is updated.
+    keep_observations keeps every stage latency (see Histogram), for benchmark_pipeline.py.
+    """
+    STAGES = ('cvtColor', 'yolo', 'process_yolo_output', '_adjust_coords', 'find_homography',
+              'transform_to_boardplane', '_process_predictions', 'score', 'frame')
+
+    def __init__(self, registry=None, labels=None, keep_observations=False):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        labels = self.labels = labels or {}
+        self.stages = {stage: self.registry.histogram('dart_pipeline_stage_seconds', "Time spent in each stage of the vision loop",
+                                                      {**labels, 'stage': stage}, keep_observations=keep_observations)
+                       for stage in self.STAGES}
+        self.frames_captured = self.registry.counter('dart_frames_captured_total', "Frames read from the frame source", labels)
+        self.frames_processed = self.registry.counter('dart_frames_processed_total', "Frames taken through the vision loop", labels)
+        self.frames_dropped = self.registry.counter('dart_frames_dropped_total', "Frames overwritten in the capture buffer before they were processed", labels)
+        self.frames_gated = self.registry.counter('dart_frames_gated_total', "Frames where the motion gate skipped inference", labels)
+        self.calibration_failures = self.registry.counter('dart_calibration_failures_total', "Frames skipped for having more than two calibration points missing", labels)
+        self.darts_committed = self.registry.counter('dart_darts_committed_total', "Darts committed to the scorer", labels)
+        self.visits = self.registry.counter('dart_visits_committed_total', "Visits committed to the scorer", labels)
+        self.busts = self.registry.counter('dart_busts_total', "Committed visits that were busts", labels)
+
+    def stage(self, name):
+        return self.stages[name].time()
+
+    def add_corrections_source(self, func, labels=None):
+        """num_corrections lives on VideoProcessing (the GUI increments it), so it is read at scrape time"""
+        self.registry.counter('dart_user_corrections_total', "Manual calibration/dart corrections made by the user",
+                              labels if labels is not None else self.labels, func)
+
+    def render(self):
+        return self.registry.render()
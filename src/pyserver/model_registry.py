@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import numpy as np
+
+
+class ModelRegistry:
+    """
+    Loads each model once per process and shares it between components.
+
+    get() loads the weights for a backend on first use, then runs `warmup_runs` inferences on a
+    blank `warmup_size` square image so the first real frames aren't slowed down by lazy
+    initialisation inside torch/ultralytics. Import, load and warm-up times are recorded separately
+    in `timings`, as is building the shared GetScores for a weights file. GetScores is handed the
+    registry's torch model for its weights instead of loading a copy of its own.
+    """
+    def __init__(self, warmup_runs=3, warmup_size=640):
+        self.warmup_runs = warmup_runs
+        self.warmup_size = warmup_size
+        self.timings = {'import': None, 'load': {}, 'warmup': {}, 'scores': {}, 'score_lut': {}}
+        self._models = {}
+        self._scorers = {}
+        self._score_luts = {}
+        self._lock = threading.RLock() # get_scores() calls get() while holding it
+
+    def _import(self):
+        if self.timings['import'] is None:
+            start = time.perf_counter()
+            import ultralytics # noqa: F401 - pulls in torch, the dominant import cost
+            self.timings['import'] = time.perf_counter() - start
+
+    def get(self, weights="weights.pt", backend='torch', int8=False, imgsz=640):
+        key = (weights, backend, int8, imgsz)
+        with self._lock:
+            if key not in self._models:
+                self._import()
+                from inference_backend import load_model
+
+                start = time.perf_counter()
+                model = load_model(weights, backend, int8, imgsz=imgsz)
+                self.timings['load'][key] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                blank = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+                for _ in range(self.warmup_runs):
+                    model(blank, verbose=False)
+                self.timings['warmup'][key] = time.perf_counter() - start
+                self._models[key] = model
+            return self._models[key]
+
+    def get_scores(self, weights="weights.pt"):
+        """Shared GetScores instance for the weights, built around the shared model"""
+        with self._lock:
+            if weights not in self._scorers:
+                model = self.get(weights) # loaded and timed as a model, not as part of GetScores
+                start = time.perf_counter()
+                import get_scores
+
+                # GetScores only takes a weights path and loads it with YOLO(); while it is built, have
+                # that return the model already loaded here rather than a second copy of the weights
+                loader = getattr(get_scores, 'YOLO', None)
+                get_scores.YOLO = lambda *args, **kwargs: model
+                try:
+                    self._scorers[weights] = get_scores.GetScores(weights)
+                finally:
+                    if loader is None:
+                        del get_scores.YOLO
+                    else:
+                        get_scores.YOLO = loader
+                self.timings['scores'][weights] = time.perf_counter() - start
+            return self._scorers[weights]
+
+    def get_score_lut(self, weights="weights.pt", resolution=512):
+        """
+        Shared ScoreLUT built from GetScores' board geometry. The table is cached next to the
+        weights and rebuilt when get_scores.py is newer than the cache.
+        """
+        scores = self.get_scores(weights)
+        key = (weights, resolution)
+        with self._lock:
+            if key not in self._score_luts:
+                import get_scores
+                from scoring_lut import ScoreLUT
+
+                start = time.perf_counter()
+                path = f"{os.path.splitext(weights)[0]}_score_lut_{resolution}.npz"
+                if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(get_scores.__file__):
+                    lut = ScoreLUT.load(path, scores.score)
+                else:
+                    lut = ScoreLUT.build(scores.score, resolution)
+                    lut.save(path)
+                self.timings['score_lut'][key] = time.perf_counter() - start
+                self._score_luts[key] = lut
+            return self._score_luts[key]
+
+    def report(self):
+        lines = [f"import: {self.timings['import'] or 0:.2f}s"]
+        for key, load_time in self.timings['load'].items():
+            weights, backend, int8 = key
+            name = f"{weights} ({backend}{', int8' if int8 else ''})"
+            lines.append(f"{name}: load {load_time:.2f}s, warm-up {self.timings['warmup'][key]:.2f}s ({self.warmup_runs} runs)")
+        for weights, scores_time in self.timings['scores'].items():
+            lines.append(f"{weights} GetScores: {scores_time:.2f}s")
+        for (weights, resolution), lut_time in self.timings['score_lut'].items():
+            lines.append(f"{weights} score table ({resolution}x{resolution}): {lut_time:.2f}s")
+        return '\n'.join(lines)
+
+
+registry = ModelRegistry()
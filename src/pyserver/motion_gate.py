@@ -0,0 +1,68 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change detector on the square board ROI used to decide whether a frame needs inference.
+    Frames are cropped, converted to grayscale and downscaled to `size` pixels square, then compared
+    with the frame that was last sent to the model. Inference runs when more than `min_changed` (a
+    fraction) of the thumbnail's pixels differ by more than `threshold` grey levels, for
+    `settle_frames` frames after that (so darts are seen once the throw has come to rest), and at
+    least every `keepalive` seconds. Counting changed pixels rather than averaging the difference
+    keeps a small, local change such as a dart landing (well under 1% of the ROI) from being
+    diluted by the rest of the board.
+    """
+    def __init__(self, threshold=12, min_changed=0.0005, keepalive=1.0, settle_frames=3, size=128):
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.keepalive = keepalive
+        self.settle_frames = settle_frames
+        self.size = size
+        self._reference = None
+        self._last_inference_time = float('-inf')
+        self._settle_remaining = 0
+        self.frames_gated = 0
+        self.frames_passed = 0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        side = min(h, w)
+        y0, x0 = (h - side) // 2, (w - side) // 2
+        roi = frame[y0:y0 + side, x0:x0 + side]
+        small = cv2.resize(roi, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        thumbnail = self._thumbnail(frame)
+
+        if self._reference is None:
+            changed = True
+        else:
+            changed = np.count_nonzero(cv2.absdiff(thumbnail, self._reference) > self.threshold) > self.min_changed * thumbnail.size
+
+        if changed:
+            self._settle_remaining = self.settle_frames
+            run = True
+        elif self._settle_remaining > 0:
+            self._settle_remaining -= 1
+            run = True
+        else:
+            run = now - self._last_inference_time >= self.keepalive
+
+        if run:
+            self._reference = thumbnail
+            self._last_inference_time = now
+            self.frames_passed += 1
+        else:
+            self.frames_gated += 1
+        return run
+
+    def reset(self):
+        self._reference = None
+        self._last_inference_time = float('-inf') # a replayed timeline may start again at 0
+        self._settle_remaining = 0
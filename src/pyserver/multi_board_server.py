@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import numpy as np
+from websockets.asyncio.server import serve
+from urllib.parse import urlparse
+from inference_backend import BACKENDS
+from inference_scheduler import InferenceScheduler
+from metrics import MetricsRegistry, PipelineMetrics
+from model_registry import registry
+from scorer import Scorer
+from server import DartMonitorServer
+from video_processing import VideoProcessing
+
+
+class MultiBoardServer:
+    """
+    Hosts several boards in one process. Every board has its own camera, pipeline thread, scorer and
+    websocket channel at /board/<n>, but all boards share one copy of the model weights: ROI frames
+    are submitted to a central InferenceScheduler that runs them as batched model calls.
+
+    Each board's pipeline runs on its own thread. /metrics serves every board's metrics from one
+    registry, told apart by a `board` label.
+    """
+    def __init__(self, camera_indices, model_dir="weights.pt", resolution=np.array([720, 1280]), host="localhost", port=8765,
+                 max_batch=None, max_wait=0.01, roi_size=None, start_score=301, capture_mode='raw', backend='torch', int8=False, imgsz=640):
+        self.host = host
+        self.port = port
+        self.model = registry.get(model_dir, backend, int8, imgsz)
+        self.predict = registry.get_scores(model_dir)
+        if max_batch is None: # exports are made with a fixed batch of one
+            max_batch = len(camera_indices) if backend == 'torch' else 1
+        self.scheduler = InferenceScheduler(self.model, max_batch=max_batch, max_wait=max_wait)
+
+        self.metrics_registry = MetricsRegistry()
+        self.boards = []
+        for board_index, camera_index in enumerate(camera_indices):
+            metrics = PipelineMetrics(self.metrics_registry, {'board': str(board_index)})
+            video_processing = VideoProcessing(model_dir, model=self.scheduler, predict=self.predict, camera_index=camera_index,
+                                               headless=True, inference_mode='roi', roi_size=roi_size, capture_mode=capture_mode, imgsz=imgsz,
+                                               metrics=metrics)
+            self.boards.append(DartMonitorServer(Scorer(start_score=start_score), resolution=resolution, host=host, port=port,
+                                                 video_processing=video_processing))
+
+    def board_for_path(self, path):
+        parts = path.split('?')[0].strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'board' and parts[1].isdigit() and int(parts[1]) < len(self.boards):
+            return self.boards[int(parts[1])]
+        return None
+
+    def process_request(self, connection, request):
+        """Answer plain HTTP scrapes of /metrics for all boards; everything else continues to the websocket handshake"""
+        if urlparse(request.path).path != '/metrics':
+            return None
+        response = connection.respond(200, self.metrics_registry.render())
+        del response.headers['Content-Type']
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
+
+    async def handler(self, websocket):
+        board = self.board_for_path(websocket.request.path)
+        if board is None:
+            await websocket.close(code=1008, reason="unknown board, connect to /board/<n>")
+            return
+        await board.handler(websocket)
+
+    async def main(self):
+        print(f"{len(self.boards)} boards ready\n{registry.report()}")
+        self.scheduler.start()
+        pipelines = [asyncio.ensure_future(board.run_pipeline()) for board in self.boards]
+        try:
+            async with serve(self.handler, self.host, self.port, process_request=self.process_request):
+                await asyncio.gather(*pipelines)
+        finally:
+            # one board failing (or Ctrl-C) stops them all; the boards go first so none submits again,
+            # then stopping the scheduler fails any frame still waiting and frees their threads
+            for board in self.boards:
+                board.video_processing.stop()
+            for pipeline in pipelines:
+                pipeline.cancel()
+            self.scheduler.stop()
+            await asyncio.gather(*pipelines, return_exceptions=True)
+
+    def launch(self):
+        asyncio.run(self.main())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve several dartboards from one process with shared batched inference")
+    parser.add_argument('cameras', type=int, nargs='+', help="camera index for each board, in board order")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-wait', type=float, default=0.01, help="longest a frame waits for a batch to fill, in seconds")
+    parser.add_argument('--roi-size', type=int, default=None)
+    parser.add_argument('--capture-mode', default='raw', choices=['raw', 'mjpeg'], help="'mjpeg' keeps several cameras within USB bandwidth")
+    parser.add_argument('--backend', default='torch', choices=BACKENDS, help="inference backend, see inference_backend.py")
+    parser.add_argument('--int8', action='store_true', help="INT8-quantised export (onnx/openvino only)")
+    parser.add_argument('--imgsz', type=int, default=640, help="model input size, exports are made for it")
+    args = parser.parse_args()
+    MultiBoardServer(args.cameras, args.weights, port=args.port, max_wait=args.max_wait, roi_size=args.roi_size,
+                     capture_mode=args.capture_mode, backend=args.backend, int8=args.int8, imgsz=args.imgsz).launch()
@@ -0,0 +1,295 @@
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from video_processing import VideoProcessing
+
+FRAME_TIMEOUT = 3.0 # seconds without a new frame before a live camera counts as lost
+SYNC_TIMEOUT = 10.0 # longest a worker waits for the others at the start of a round
+
+
+def _dart_confidences(result, dart_coords):
+    """
+    Confidence for each dart GetScores.process_yolo_output returned: that of the detection box
+    whose centre it is. The darts themselves always come from process_yolo_output, as in the
+    single-camera pipeline, so both score the same detections.
+    """
+    if len(dart_coords) == 0 or len(result.boxes) == 0:
+        return np.ones(len(dart_coords))
+    centres = result.boxes.xywhn[:, :2].cpu().numpy()
+    nearest = np.argmin(np.linalg.norm(centres[None] - np.asarray(dart_coords)[:, None], axis=2), axis=1)
+    return result.boxes.conf.cpu().numpy()[nearest]
+
+
+def _frame_after(buffer, target):
+    """First frame in the capture buffer grabbed at or after `target`, or None if the camera stopped delivering"""
+    deadline = time.monotonic() + FRAME_TIMEOUT
+    while time.monotonic() < deadline:
+        frame, timestamp, _ = buffer.get(timeout=0.1)
+        if frame is None:
+            if buffer.closed:
+                return None, None
+            continue
+        if timestamp >= target: # older frames were grabbed before this round started
+            return frame, timestamp
+    return None, None
+
+
+def camera_worker(camera_id, source, model_dir, roi_size, realtime, out_queue, stop_event, resolution=None, fps=30, barrier=None):
+    """
+    Capture + inference for one camera, run in its own process.
+
+    Each frame is cropped to the square board ROI, run through the model and mapped onto the board
+    plane with this view's own (locked) homography. Results are put on out_queue as dicts with the
+    capture timestamp, board-plane darts and their confidences. `source` is a camera index or a
+    recorded video file; recorded files are timestamped from their own timeline so several files
+    line up the same way live cameras do.
+
+    Live cameras are read by a CaptureThread into a latest-frame buffer (so frames never queue up
+    in the driver while the model runs) and timestamped at grab. Workers of live cameras meet at
+    `barrier` before each frame, and each then takes the first frame grabbed after that moment, so
+    the views of one round are less than a frame period apart however long inference took.
+    """
+    from model_registry import registry
+    from calibration_tracker import CalibrationTracker
+    from capture import CameraSource, CaptureThread, VideoFileSource
+
+    model = registry.get(model_dir)
+    predict = registry.get_scores(model_dir)
+    tracker = CalibrationTracker()
+    no_user_calibration = -np.ones((6, 2))
+
+    is_file = isinstance(source, str)
+    frame_source = VideoFileSource(source, realtime) if is_file else CameraSource(source, resolution, fps)
+    try:
+        frame_source.open()
+    except RuntimeError as e:
+        out_queue.put({'camera_id': camera_id, 'error': str(e)})
+        if barrier is not None:
+            barrier.abort()
+        return
+    capture = None
+    if frame_source.live:
+        capture = CaptureThread(frame_source)
+        capture.start()
+    frame_index = 0
+
+    try:
+        while not stop_event.is_set():
+            if capture is None:
+                ret, frame, timestamp = frame_source.read()
+                if not ret:
+                    if frame_source.exhausted:
+                        break # end of recording
+                    continue
+            else:
+                if barrier is not None:
+                    try:
+                        barrier.wait(SYNC_TIMEOUT)
+                    except threading.BrokenBarrierError: # another camera stopped, or we are shutting down
+                        if not stop_event.is_set():
+                            out_queue.put({'camera_id': camera_id, 'error': "Lost sync with the other cameras"})
+                        break
+                frame, timestamp = _frame_after(capture.buffer, time.monotonic())
+                if frame is None:
+                    out_queue.put({'camera_id': camera_id, 'error': f"Camera source {source} stopped delivering frames"})
+                    break
+
+            h, w = frame.shape[:2]
+            side = min(h, w)
+            roi = frame[(h - side) // 2:(h - side) // 2 + side, (w - side) // 2:(w - side) // 2 + side]
+            if roi_size is not None and roi_size < side:
+                roi = cv2.resize(roi, (roi_size, roi_size), interpolation=cv2.INTER_AREA)
+            result = model(roi if frame_source.rgb else cv2.cvtColor(roi, cv2.COLOR_BGR2RGB), verbose=False)[0]
+
+            calibration_coords, dart_coords = predict.process_yolo_output(result)
+            view = {'camera_id': camera_id, 'timestamp': timestamp, 'frame_index': frame_index,
+                    'darts': np.empty((0, 2)), 'confidences': np.empty(0), 'calibrated': False}
+            frame_index += 1
+
+            valid = np.all(calibration_coords != -1, axis=1)
+            if np.count_nonzero(~valid) <= 2:
+                H_matrix = tracker.update(calibration_coords, valid, no_user_calibration,
+                                          lambda coords: predict.find_homography(coords, side))
+                if len(dart_coords):
+                    view['darts'] = np.asarray(predict.transform_to_boardplane(H_matrix[0], dart_coords, side)).reshape(-1, 2)
+                    view['confidences'] = _dart_confidences(result, dart_coords)
+                view['calibrated'] = True
+            out_queue.put(view)
+    finally:
+        if barrier is not None:
+            barrier.abort() # don't leave the other cameras waiting for this one
+        if capture is not None:
+            capture.stop() # releases the source once its last read returns
+        else:
+            frame_source.release()
+        out_queue.put({'camera_id': camera_id, 'done': True})
+
+
+def fuse_views(views, match_radius=0.02, outlier_radius=0.01, max_darts=3):
+    """
+    Fuse board-plane darts from several synchronised views.
+
+    Detections are grouped greedily, highest confidence first, into clusters holding at most one
+    detection per camera. With three or more members, detections further than outlier_radius from
+    the cluster median are rejected. Each cluster becomes its confidence-weighted mean position.
+    Darts seen by a single camera are kept (the other views may be occluded).
+    Returns up to max_darts fused darts, most confident first.
+    """
+    detections = [(point, conf, view['camera_id']) for view in views if view['calibrated']
+                  for point, conf in zip(view['darts'], view['confidences'])]
+    detections.sort(key=lambda detection: -detection[1])
+
+    clusters = [] # lists of (point, conf, camera_id)
+    for point, conf, camera_id in detections:
+        best, best_distance = None, match_radius
+        for cluster in clusters:
+            if any(member[2] == camera_id for member in cluster):
+                continue
+            points = np.array([member[0] for member in cluster])
+            weights = np.array([member[1] for member in cluster])
+            distance = np.linalg.norm(np.average(points, axis=0, weights=weights) - point)
+            if distance < best_distance:
+                best, best_distance = cluster, distance
+        if best is None:
+            clusters.append([(point, conf, camera_id)])
+        else:
+            best.append((point, conf, camera_id))
+
+    fused = []
+    for cluster in clusters:
+        points = np.array([member[0] for member in cluster])
+        weights = np.array([member[1] for member in cluster])
+        if len(cluster) >= 3:
+            keep = np.linalg.norm(points - np.median(points, axis=0), axis=1) <= outlier_radius
+            if np.any(keep):
+                points, weights = points[keep], weights[keep]
+        fused.append((np.average(points, axis=0, weights=weights), weights.sum()))
+
+    fused.sort(key=lambda item: -item[1])
+    return np.array([point for point, _ in fused[:max_darts]]).reshape(-1, 2)
+
+
+class ViewSynchronizer:
+    """
+    Groups per-camera results that were captured at the same moment.
+
+    A group is released as soon as every camera has delivered a frame within `window` seconds of
+    the oldest pending frame, so fusion waits no longer than the slowest view. If a camera has
+    nothing within the window after `max_wait` seconds of wall time, the group is released without
+    it (set max_wait=None for offline replay, where every view eventually delivers).
+    """
+    def __init__(self, camera_ids, window=0.04, max_wait=0.5):
+        self.camera_ids = list(camera_ids)
+        self.window = window
+        self.max_wait = max_wait
+        self.pending = {camera_id: deque() for camera_id in self.camera_ids}
+        self.finished = set()
+        self._anchor_arrival = None
+
+    def add(self, view):
+        self.pending[view['camera_id']].append(view)
+        if self._anchor_arrival is None:
+            self._anchor_arrival = time.monotonic()
+        return self.poll()
+
+    def finish(self, camera_id):
+        self.finished.add(camera_id)
+        return self.poll()
+
+    def poll(self):
+        """Return the groups that are ready to fuse"""
+        groups = []
+        while True:
+            heads = [views[0] for views in self.pending.values() if views]
+            if not heads:
+                self._anchor_arrival = None
+                break
+            anchor = min(view['timestamp'] for view in heads)
+            group, waiting = [], False
+            for camera_id, views in self.pending.items():
+                while views and views[0]['timestamp'] < anchor - self.window:
+                    views.popleft() # too old to pair with anything
+                if views and views[0]['timestamp'] <= anchor + self.window:
+                    group.append(views[0])
+                elif camera_id not in self.finished and not (views and views[0]['timestamp'] > anchor + self.window):
+                    waiting = True # this camera may still deliver a matching frame
+            timed_out = self.max_wait is not None and time.monotonic() - self._anchor_arrival >= self.max_wait
+            if waiting and not timed_out:
+                break
+            for view in group:
+                self.pending[view['camera_id']].popleft()
+            groups.append(group)
+            self._anchor_arrival = time.monotonic()
+        return groups
+
+
+class MultiCameraProcessing(VideoProcessing):
+    """
+    Scores a board from 2-3 cameras. Each camera's capture and inference runs in its own worker
+    process with its own homography; the board-plane darts from all views are synchronised by
+    capture time and fused before the usual commit logic. Sources can be camera indices or recorded
+    video files. Runs headless: there is no single frame to hand to a GUI.
+
+    Live cameras are opened at `resolution`/`fps` and captured in lockstep, so views of the same
+    round land within one frame period of each other: the default sync_window is just over a
+    frame at 30 fps, and max_wait covers the slowest camera's inference.
+    """
+    def __init__(self, model_dir="weights.pt", roi_size=None, sync_window=0.04, max_wait=0.5,
+                 match_radius=0.02, outlier_radius=0.01, resolution=None, fps=30, **kwargs):
+        kwargs.setdefault('headless', True)
+        super().__init__(model_dir, **kwargs) # the model itself is only loaded in the camera workers
+        self.roi_size = roi_size
+        self.resolution = resolution
+        self.fps = fps
+        self.sync_window = sync_window
+        self.max_wait = max_wait
+        self.fusion_match_radius = match_radius
+        self.outlier_radius = outlier_radius
+
+    def start(self, GUI, scorer, sources, realtime=True):
+        self._reset_game_state(scorer)
+        context = multiprocessing.get_context('spawn')
+        out_queue = context.Queue(maxsize=64)
+        stop_event = context.Event()
+        live = [not isinstance(source, str) for source in sources]
+        barrier = context.Barrier(sum(live)) if sum(live) > 1 else None
+        workers = [context.Process(target=camera_worker, name=f"camera-{camera_id}", daemon=True,
+                                   args=(camera_id, source, self.model_dir, self.roi_size, realtime, out_queue, stop_event,
+                                         self.resolution, self.fps, barrier if is_live else None))
+                   for camera_id, (source, is_live) in enumerate(zip(sources, live))]
+        synchronizer = ViewSynchronizer(range(len(sources)), self.sync_window, self.max_wait if realtime else None)
+        running = len(workers)
+        for worker in workers:
+            worker.start()
+
+        try:
+            while running and not self.game_over:
+                try:
+                    view = out_queue.get(timeout=self.max_wait or 0.05)
+                except queue.Empty:
+                    groups = synchronizer.poll()
+                else:
+                    if 'error' in view:
+                        raise RuntimeError(view['error'])
+                    if view.get('done'):
+                        running -= 1
+                        groups = synchronizer.finish(view['camera_id'])
+                    else:
+                        groups = synchronizer.add(view)
+
+                for group in groups:
+                    if not any(view['calibrated'] for view in group):
+                        continue
+                    self._update_visit(fuse_views(group, self.fusion_match_radius, self.outlier_radius))
+        finally:
+            stop_event.set()
+            if barrier is not None:
+                barrier.abort() # wake workers waiting on a round
+            for worker in workers:
+                worker.join(timeout=2.0)
+                if worker.is_alive():
+                    worker.terminate()
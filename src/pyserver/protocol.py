@@ -0,0 +1,67 @@
+import json
+
+try:
+    import msgpack
+except ImportError: # optional binary encoding
+    msgpack = None
+
+PROTOCOL_VERSION = 1
+
+# Wire format, every message is a map with a type 't' and protocol version 'v':
+#   snapshot  {'t': 's', 'v': 1, 'seq': n, 'state': {...}}         sent on connect and on resync
+#   delta     {'t': 'd', 'v': 1, 'seq': n, 'set': {field: value}}   only the fields that changed
+#   event     {'t': 'e', 'v': 1, 'seq': n, 'event': {...}}          dart / bust / visit events
+# seq increases by exactly one per delta or event, so a client that sees a gap sends
+# {"t": "resync"} and receives a fresh snapshot.
+STATE_FIELDS = ('scores', 'current_player', 'darts_in_visit', 'remaining')
+
+
+def encode_json(message):
+    return json.dumps(message, separators=(',', ':'))
+
+
+def encode_msgpack(message):
+    return msgpack.packb(message, use_bin_type=True)
+
+
+ENCODERS = {'json': encode_json}
+if msgpack is not None:
+    ENCODERS['msgpack'] = encode_msgpack
+
+
+def decode(message):
+    if isinstance(message, bytes):
+        if msgpack is None:
+            raise ValueError("Received a binary message but msgpack is not installed")
+        return msgpack.unpackb(message, raw=False)
+    return json.loads(message)
+
+
+def negotiate_encoding(requested):
+    """Pick the encoding for a client, falling back to json when the requested one is unavailable"""
+    return requested if requested in ENCODERS else 'json'
+
+
+class StateProtocol:
+    """Tracks the scoreboard state and turns state changes into sequence-numbered deltas"""
+    def __init__(self, initial_state=None):
+        self.seq = 0
+        self.state = {field: None for field in STATE_FIELDS}
+        if initial_state is not None:
+            self.state.update(initial_state)
+
+    def snapshot(self):
+        return {'t': 's', 'v': PROTOCOL_VERSION, 'seq': self.seq, 'state': dict(self.state)}
+
+    def update(self, new_state):
+        """Apply a new state and return the delta message, or None if nothing changed"""
+        changed = {field: value for field, value in new_state.items() if field in self.state and self.state[field] != value}
+        if not changed:
+            return None
+        self.state.update(changed)
+        self.seq += 1
+        return {'t': 'd', 'v': PROTOCOL_VERSION, 'seq': self.seq, 'set': changed}
+
+    def event(self, event):
+        self.seq += 1
+        return {'t': 'e', 'v': PROTOCOL_VERSION, 'seq': self.seq, 'event': event}
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import time
+from capture import ImageDirectorySource, VideoFileSource
+from calibration_tracker import CalibrationTracker
+from dart_tracker import DartTracker
+from scorer import Scorer
+from video_processing import VideoProcessing
+
+LOGGED_EVENTS = ('dart', 'bust', 'visit')
+
+
+def make_source(path, realtime=False, fps=30, repeat=5):
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, fps=fps, repeat=repeat, realtime=realtime)
+    return VideoFileSource(path, realtime=realtime)
+
+
+class EventLog:
+    """Writes pipeline events as JSON lines, keyed by frame number rather than wall-clock time so logs diff cleanly between versions"""
+    def __init__(self, path, source):
+        self.file = open(path, 'w') if path else None
+        self.source = source
+        self.counts = {kind: 0 for kind in LOGGED_EVENTS}
+
+    def __call__(self, event):
+        if event['type'] not in LOGGED_EVENTS:
+            return
+        self.counts[event['type']] += 1
+        if self.file is None:
+            return
+        record = {key: value for key, value in event.items() if key != 'ts'}
+        if isinstance(self.source, ImageDirectorySource):
+            record['image'] = os.path.basename(self.source.current_path)
+        self.file.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session (video file or image folder) through the full scoring pipeline")
+    parser.add_argument('source', help="video file or directory of images, e.g. training_data")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--output', default='replay_events.jsonl', help="per-dart event log; empty to disable")
+    parser.add_argument('--realtime', action='store_true', help="pace playback at the recording's frame rate instead of running unthrottled")
+    parser.add_argument('--fps', type=float, default=30, help="frame rate assigned to image folders")
+    parser.add_argument('--repeat', type=int, default=5, help="frames each still image is shown for")
+    parser.add_argument('--inference-mode', default='full', choices=['full', 'roi'])
+    parser.add_argument('--roi-size', type=int, default=None)
+    parser.add_argument('--tracker', action='store_true', help="use the Kalman/Hungarian dart tracker instead of queue voting")
+    parser.add_argument('--lock-calibration', action='store_true', help="lock the homography once calibration is stable")
+    parser.add_argument('--players', type=int, default=1)
+    args = parser.parse_args()
+
+    source = make_source(args.source, args.realtime, args.fps, args.repeat)
+    log = EventLog(args.output, source)
+    vp = VideoProcessing(args.weights, backend=args.backend, headless=True, inference_mode=args.inference_mode, roi_size=args.roi_size,
+                         tracker=DartTracker() if args.tracker else None,
+                         calibration_tracker=CalibrationTracker() if args.lock_calibration else None,
+                         on_event=log)
+    vp.load_model()
+
+    start = time.perf_counter()
+    try:
+        vp.start(None, Scorer(num_players=args.players), source=source)
+    finally:
+        log.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Processed {vp.frames_processed} frames in {elapsed:.1f}s ({vp.frames_processed / elapsed:.1f} fps)")
+    print("Events: " + ', '.join(f"{kind}={count}" for kind, count in log.counts.items()))
+    if args.output:
+        print(f"Event log written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+class Scorer:
+    """
+    Minimal x01 scorer implementing the interface VideoProcessing expects
+    (scores, current_player, get_score_for_dart, read_score, commit_score, num_dart_history).
+    Darts are segment strings as produced by GetScores.score: 'DB', 'B', 'D20', 'T19', '5', ...
+    """
+    def __init__(self, num_players=1, start_score=301):
+        self.start_score = start_score
+        self.scores = [start_score] * num_players
+        self.current_player = 0
+        self.num_dart_history = []
+        self.visit_history = [] # (player, darts, score, bust)
+        self.last_read_score = None
+
+    def get_score_for_dart(self, dart):
+        if dart in ('', '0'):
+            return 0
+        if dart == 'DB':
+            return 50
+        if dart == 'B':
+            return 25
+        if dart[0] == 'D':
+            return 2 * int(dart[1:])
+        if dart[0] == 'T':
+            return 3 * int(dart[1:])
+        if dart[0] == 'S':
+            return int(dart[1:])
+        return int(dart)
+
+    def read_score(self, score):
+        """Called once per visit when the visit's darts are all in (or the visit finished the leg)"""
+        self.last_read_score = score
+
+    def is_bust(self, darts, remaining):
+        return remaining < 0 or remaining == 1 or (remaining == 0 and (len(darts) == 0 or darts[-1][0] != 'D'))
+
+    def commit_score(self, darts):
+        score = sum(self.get_score_for_dart(dart) for dart in darts)
+        remaining = self.scores[self.current_player] - score
+        bust = self.is_bust(darts, remaining)
+        if not bust:
+            self.scores[self.current_player] = remaining
+
+        self.num_dart_history.append(len(darts))
+        self.visit_history.append((self.current_player, list(darts), score, bust))
+        self.current_player = (self.current_player + 1) % len(self.scores)
+        return score, bust
+
+    @property
+    def game_over(self):
+        return any(score == 0 for score in self.scores)
@@ -0,0 +1,155 @@
+import argparse
+import time
+import numpy as np
+from scorer import Scorer
+
+
+def _grow(mask):
+    """Dilate a boolean raster by one cell in every direction (including diagonals)"""
+    padded = np.pad(mask, 1)
+    grown = np.zeros_like(mask)
+    h, w = mask.shape
+    for dy in range(3):
+        for dx in range(3):
+            grown |= padded[dy:dy + h, dx:dx + w]
+    return grown
+
+
+class ScoreLUT:
+    """
+    Raster lookup table from board-plane coordinates to segments.
+
+    The board plane inside `bounds` (x0, y0, x1, y1) is divided into resolution x resolution cells,
+    each labelled with the segment GetScores.score gives its centre. Scoring a batch of coordinates
+    is then one array index for the segment id and one for the points. Cells touching a change of
+    segment straddle a wire, so points falling in them (or outside the table) are scored with the
+    exact geometry by calling `exact_score` instead; at the default resolution that is under a
+    tenth of the cells.
+
+    Segment ids index `segments` ('DB', 'B', 'T20', '5', '0', ...); -1 marks placeholder
+    coordinates ([-1, -1] fill, NaN), which score 0.
+    """
+    def __init__(self, segment_ids, exact_cells, segments, bounds=(0.0, 0.0, 1.0, 1.0), exact_score=None):
+        self.segment_ids = segment_ids
+        self.exact_cells = exact_cells
+        self.bounds = tuple(float(bound) for bound in bounds)
+        self.resolution = segment_ids.shape[0]
+        self.exact_score = exact_score
+        self._scorer = Scorer()
+        self.segments = []
+        self._segment_index = {}
+        self.points = np.zeros(0, dtype=np.int16)
+        for segment in segments:
+            self._segment_id(segment)
+
+    def _segment_id(self, segment):
+        if segment not in self._segment_index:
+            self._segment_index[segment] = len(self.segments)
+            self.segments.append(segment)
+            self.points = np.append(self.points, np.int16(self._scorer.get_score_for_dart(segment)))
+        return self._segment_index[segment]
+
+    @classmethod
+    def build(cls, exact_score, resolution=512, bounds=(0.0, 0.0, 1.0, 1.0), chunk_size=4096):
+        """Label every cell centre with exact_score (a GetScores.score-like callable) and mark the wire cells"""
+        x0, y0, x1, y1 = bounds
+        xs = x0 + (np.arange(resolution) + 0.5) * (x1 - x0) / resolution
+        ys = y0 + (np.arange(resolution) + 0.5) * (y1 - y0) / resolution
+        centres = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2) # row-major: row = y, column = x
+
+        segment_index = {}
+        ids = np.empty(len(centres), dtype=np.int16)
+        for start in range(0, len(centres), chunk_size):
+            segments, _ = exact_score(centres[start:start + chunk_size])
+            ids[start:start + len(segments)] = [segment_index.setdefault(segment, len(segment_index)) for segment in segments]
+        ids = ids.reshape(resolution, resolution)
+
+        # cells on either side of a change of segment, grown by one more cell for safety
+        changes = np.zeros(ids.shape, dtype=bool)
+        vertical = ids[1:] != ids[:-1]
+        horizontal = ids[:, 1:] != ids[:, :-1]
+        changes[1:] |= vertical
+        changes[:-1] |= vertical
+        changes[:, 1:] |= horizontal
+        changes[:, :-1] |= horizontal
+        exact_cells = _grow(changes)
+
+        segments = sorted(segment_index, key=segment_index.get)
+        return cls(ids, exact_cells, segments, bounds, exact_score)
+
+    def save(self, path):
+        np.savez_compressed(path, segment_ids=self.segment_ids, exact_cells=self.exact_cells,
+                            segments=np.array(self.segments), bounds=np.array(self.bounds))
+
+    @classmethod
+    def load(cls, path, exact_score=None):
+        with np.load(path) as data:
+            return cls(data['segment_ids'], data['exact_cells'], [str(segment) for segment in data['segments']],
+                       tuple(data['bounds']), exact_score)
+
+    def lookup(self, coords):
+        """
+        Segment ids and points for an array of board-plane coordinates of any shape (..., 2), e.g. a
+        whole (frames, 3, 2) prediction history.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        shape = coords.shape[:-1]
+        flat = coords.reshape(-1, 2)
+        x0, y0, x1, y1 = self.bounds
+        columns = (flat[:, 0] - x0) * (self.resolution / (x1 - x0))
+        rows = (flat[:, 1] - y0) * (self.resolution / (y1 - y0))
+
+        valid = np.all(np.isfinite(flat), axis=1) & ~np.all(flat == -1, axis=1)
+        inside = valid & (columns >= 0) & (columns < self.resolution) & (rows >= 0) & (rows < self.resolution)
+        columns = columns[inside].astype(np.intp)
+        rows = rows[inside].astype(np.intp)
+
+        ids = np.full(len(flat), -1, dtype=np.int16)
+        ids[inside] = self.segment_ids[rows, columns]
+        exact = valid & ~inside
+        exact[inside] = self.exact_cells[rows, columns]
+        if self.exact_score is not None and np.any(exact):
+            segments, _ = self.exact_score(flat[exact])
+            ids[exact] = [self._segment_id(segment) for segment in segments]
+        elif np.any(valid & ~inside):
+            ids[valid & ~inside] = self._segment_id('0') # no exact geometry to ask: off the table is off the board
+
+        points = np.where(ids >= 0, self.points[ids], 0)
+        return ids.reshape(shape), points.reshape(shape)
+
+    def score(self, coords):
+        """Drop-in for GetScores.score: (segment strings, total points) for an (N, 2) array of darts"""
+        ids, points = self.lookup(np.asarray(coords, dtype=np.float64).reshape(-1, 2))
+        return [self.segments[segment_id] if segment_id >= 0 else '' for segment_id in ids], int(points.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the board-plane score lookup table and check it against exact scoring")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--resolution', type=int, default=512)
+    parser.add_argument('--samples', type=int, default=100000, help="random board-plane points to compare")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from model_registry import registry
+    start = time.perf_counter()
+    lut = registry.get_score_lut(args.weights, args.resolution)
+    print(f"Table {args.resolution}x{args.resolution} ready in {time.perf_counter() - start:.2f}s, "
+          f"{lut.exact_cells.mean() * 100:.1f}% of cells use exact scoring")
+
+    exact_score = lut.exact_score
+    points = np.random.default_rng(args.seed).uniform(0, 1, size=(args.samples, 2))
+    start = time.perf_counter()
+    exact, _ = exact_score(points)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    table, _ = lut.score(points)
+    table_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(exact, table))
+    print(f"exact: {exact_time / args.samples * 1e6:.2f} us/dart, table: {table_time / args.samples * 1e6:.2f} us/dart, "
+          f"{mismatches} mismatches in {args.samples}")
+
+
+if __name__ == "__main__":
+    main()
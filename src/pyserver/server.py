@@ -1,40 +1,138 @@
+import argparse
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from websockets.asyncio.server import serve
-from websockets.exceptions import ConnectionClosed
-from get_scores import GetScores
+from urllib.parse import parse_qs, urlparse
+from calibration_profiles import ProfileStore
+from fanout_hub import FanoutHub
+from inference_backend import BACKENDS
+from model_registry import registry
+from protocol import ENCODERS, StateProtocol, decode, negotiate_encoding
+from scorer import Scorer
 from video_processing import VideoProcessing
 
 
 class DartMonitorServer:
+    def __init__(self, scorer=None, GUI=None, resolution=np.array([720, 1280]), host="localhost", port=8765, video_processing=None, hub=None):
+        """
+        The vision pipeline runs in a worker thread and publishes dart/visit/bust events onto the
+        event loop, so the websocket server stays responsive whatever the pipeline is doing.
+        Without a GUI the pipeline runs headless. Events are fanned out to clients through a
+        FanoutHub, so a slow client can't hold up the others.
+
+        Clients get a snapshot of the scoreboard on connect, then sequence-numbered deltas and events
+        (see protocol.py). Connect with ?encoding=msgpack for the binary encoding.
+
+        The default pipeline keeps per-camera calibration profiles (calibration_profiles.json), so a
+        restart scores from the first frame using the last good homography.
+
+        Pipeline metrics (stage latency histograms, frame/dart counters) are served in Prometheus
+        text format over plain HTTP at /metrics on the same host and port.
+        """
+        self.scorer = scorer if scorer is not None else Scorer()
+        self.GUI = GUI
+        self.resolution = resolution
+        self.host = host
+        self.port = port
+        self.video_processing = video_processing if video_processing is not None else VideoProcessing(headless=GUI is None, profiles=ProfileStore())
+        self.hub = hub if hub is not None else FanoutHub(encoders=ENCODERS)
+        self.protocol = StateProtocol({
+            'scores': list(self.scorer.scores),
+            'current_player': self.scorer.current_player,
+            'darts_in_visit': [],
+            'remaining': self.scorer.scores[self.scorer.current_player],
+        })
+        self.metrics = self.video_processing.metrics
+        self.metrics.registry.gauge('dart_ws_clients', "Connected websocket clients", self.metrics.labels, func=lambda: len(self.hub.channels))
+        self.metrics.registry.counter('dart_ws_evicted_total', "Websocket clients evicted for falling behind", self.metrics.labels, func=lambda: self.hub.evicted)
+        self.metrics.registry.gauge('dart_ws_queue_depth_max', "Deepest per-client send queue", self.metrics.labels, func=self.hub.max_queue_depth)
+        self.metrics.registry.gauge('dart_ws_queue_depth', "Messages waiting in all client send queues", self.metrics.labels, func=self.hub.total_queue_depth)
+        self.metrics.registry.counter('dart_ws_dropped_total', "Messages dropped from full client send queues", self.metrics.labels, func=lambda: self.hub.dropped)
+        self.events = None
+        self.loop = None
+
+    async def send_snapshot(self, channel):
+        self.hub.send_to(channel, self.protocol.snapshot())
+
+    async def on_client_message(self, channel, message):
+        try:
+            request = decode(message)
+        except ValueError:
+            return
+        if isinstance(request, dict) and request.get('t') == 'resync':
+            await self.send_snapshot(channel)
+
+    def process_request(self, connection, request):
+        """Answer plain HTTP scrapes of /metrics; everything else continues to the websocket handshake"""
+        if urlparse(request.path).path != '/metrics':
+            return None
+        response = connection.respond(200, self.metrics.render())
+        del response.headers['Content-Type']
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
+
+    async def handler(self, websocket):
+        query = parse_qs(urlparse(websocket.request.path).query)
+        encoding = negotiate_encoding(query.get('encoding', ['json'])[0])
+        await self.hub.serve_client(websocket, on_connect=self.send_snapshot, on_message=self.on_client_message, encoding=encoding)
+
+    async def broadcast_events(self):
+        while True:
+            event = await self.events.get()
+            if event['type'] == 'state':
+                message = self.protocol.update(event['state'])
+                if message is None:
+                    continue
+            else:
+                message = self.protocol.event(event)
+            self.hub.publish(message)
+
+    def publish_threadsafe(self, event):
+        """Called from the vision thread: hand the event over to the event loop"""
+        try:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+        except RuntimeError:
+            pass # event loop already closed during shutdown
+
+    async def run_pipeline(self):
+        """
+        Run the vision pipeline in a worker thread and broadcast its events until it stops. The
+        pipeline never returns while the board is up, so it gets a thread of its own rather than
+        one of the default executor's, which several boards would exhaust.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue()
+        self.video_processing.on_event = self.publish_threadsafe
+
+        broadcaster = asyncio.create_task(self.broadcast_events())
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pipeline')
+        try:
+            await self.loop.run_in_executor(executor, self.video_processing.start, self.GUI, self.scorer, self.resolution)
+        finally:
+            self.video_processing.stop()
+            broadcaster.cancel()
+            executor.shutdown(wait=False)
+
+    async def main(self):
+        start = time.perf_counter()
+        await asyncio.to_thread(self.video_processing.load_model)
+        print(f"Board ready in {time.perf_counter() - start:.2f}s\n{registry.report()}")
+        async with serve(self.handler, self.host, self.port, process_request=self.process_request):
+            await self.run_pipeline()
+
     def launch(self):
-        async def handler(websocket):
-            self.clients.add(websocket)
-            try:
-                await websocket.wait_closed()
-            finally:
-                self.clients.remove(websocket)
-
-        async def send(websocket, message):
-            try:
-                await websocket.send(message)
-            except ConnectionClosed:
-                pass
-
-        async def broadcast(message):
-            for websocket in self.clients:
-                asyncio.create_task(self.send(websocket, message))
-        async def broadcast_messages():
-            while True:
-                await asyncio.sleep(1)
-                message = "is a message"
-                await broadcast(message)
-
-        async def main():
-            async with serve(handler, "localhost", 8765):
-                self.video_processing = VideoProcessing()
-                self.clients = set()
-                self.video_processing.start()
-        asyncio.run(main())
+        asyncio.run(self.main())
 
 if __name__ == '__main__':
-    DartMonitorServer().launch()
+    parser = argparse.ArgumentParser(description="Serve one dartboard's scores over websockets")
+    parser.add_argument('--weights', default='weights.pt')
+    parser.add_argument('--backend', default='torch', choices=BACKENDS, help="inference backend, see inference_backend.py")
+    parser.add_argument('--int8', action='store_true', help="INT8-quantised export (onnx/openvino only)")
+    parser.add_argument('--imgsz', type=int, default=640, help="model input size, exports are made for it")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    video_processing = VideoProcessing(args.weights, backend=args.backend, int8=args.int8, imgsz=args.imgsz, headless=True, profiles=ProfileStore())
+    DartMonitorServer(host=args.host, port=args.port, video_processing=video_processing).launch()
@@ -1,40 +1,180 @@
 from ultralytics import YOLO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import queue
+import threading
+import time
 import cv2
-import platform
+import numpy as np
+from camera_discovery import CameraDiscovery
+from dataset_prep import IMAGE_EXTENSIONS, find_label
+
+
+def _prefetch_images(paths, workers, prefetch):
+    """Yield (path, frame) in order while a thread pool decodes up to `prefetch` images ahead"""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(cv2.imread, path)))
+            if len(pending) >= prefetch:
+                yield pending[0][0], pending.popleft()[1].result()
+        while pending:
+            yield pending[0][0], pending.popleft()[1].result()
+
+
+def _prefetch_video(path, prefetch):
+    """Yield ('<video>#<frame>', frame) while a reader thread decodes up to `prefetch` frames ahead"""
+    frames = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def offer(item):
+        # never block for good on a full queue: the consumer may have stopped iterating
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        cap = cv2.VideoCapture(path)
+        index = 0
+        try:
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret or not offer((f"{os.path.basename(path)}#{index}", frame)):
+                    break
+                index += 1
+        finally:
+            cap.release()
+            offer(None)
+
+    reader = threading.Thread(target=read, name="video-reader", daemon=True)
+    reader.start()
+    try:
+        while (item := frames.get()) is not None:
+            yield item
+    finally:
+        stop.set()
+        reader.join(timeout=1.0)
+
+
+def _read_labels(label_path):
+    """YOLO label file -> (classes, xywhn boxes)"""
+    rows = np.loadtxt(label_path, ndmin=2) if os.path.getsize(label_path) > 0 else np.empty((0, 5))
+    return rows[:, 0].astype(int), rows[:, 1:5]
+
+
+def _iou(box, boxes):
+    """IoU of one xywh box against an (N, 4) array of xywh boxes"""
+    x1 = np.maximum(box[0] - box[2] / 2, boxes[:, 0] - boxes[:, 2] / 2)
+    y1 = np.maximum(box[1] - box[3] / 2, boxes[:, 1] - boxes[:, 3] / 2)
+    x2 = np.minimum(box[0] + box[2] / 2, boxes[:, 0] + boxes[:, 2] / 2)
+    y2 = np.minimum(box[1] + box[3] / 2, boxes[:, 1] + boxes[:, 3] / 2)
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    return intersection / (box[2] * box[3] + boxes[:, 2] * boxes[:, 3] - intersection + 1e-12)
 
 class ModelTester:
     def __init__(self, weights_path="runs/detect/dartboard_detection/weights/best.pt"):
         self.model = YOLO(weights_path)
         self.class_names = {0: '20', 1: '3', 2: '11', 3: '6', 4: 'dart'}
     
-    def _get_webcam_index(self):
-        """Find the first available webcam index"""
-        for index in range(5):
-            cap = cv2.VideoCapture(index)
-            if cap.isOpened():
-                ret, _ = cap.read()
-                cap.release()
-                if ret:
-                    return index
-        return 0
+    def _match(self, counts, classes, boxes, confidences, true_classes, true_boxes, iou_threshold):
+        """Greedy per-class matching, most confident prediction first; adds to counts[class] = [tp, fp, fn]"""
+        for cls in self.class_names:
+            predicted = boxes[classes == cls][np.argsort(-confidences[classes == cls])]
+            truth = true_boxes[true_classes == cls]
+            matched = np.zeros(len(truth), dtype=bool)
+            for box in predicted:
+                ious = _iou(box, truth) if len(truth) else np.empty(0)
+                ious[matched] = 0
+                if len(ious) and ious.max() >= iou_threshold:
+                    matched[ious.argmax()] = True
+                    counts[cls][0] += 1
+                else:
+                    counts[cls][1] += 1
+            counts[cls][2] += int(np.sum(~matched))
     
-    def test_live(self):
-        """Test the model with live webcam feed"""
-        webcam_index = self._get_webcam_index()
-        
-        if platform.system() == "Windows":
-            cap = cv2.VideoCapture(webcam_index, cv2.CAP_DSHOW)
+    def evaluate(self, source, output="evaluation.jsonl", batch_size=8, workers=4, prefetch=32, label_dir=None, conf=0.25, iou_threshold=0.5):
+        """
+        Offline evaluation over an image directory or a video file. Frames are decoded ahead by a
+        thread pool (a reader thread for video) while the model runs on batches of `batch_size`.
+        Per-image detections and timing are written as JSON lines to `output`. For images with a
+        YOLO label file (in label_dir or next to the image), per-class precision/recall at
+        `iou_threshold` are reported.
+        """
+        if os.path.isdir(source):
+            paths = sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+            frames = _prefetch_images(paths, workers, prefetch)
         else:
-            cap = cv2.VideoCapture(webcam_index)
+            frames = _prefetch_video(source, prefetch)
+        
+        counts = {cls: [0, 0, 0] for cls in self.class_names} # tp, fp, fn
+        labelled, total, inference_time = 0, 0, 0.0
+        start = time.perf_counter()
+        
+        def run_batch(batch, out):
+            nonlocal labelled, total, inference_time
+            batch_start = time.perf_counter()
+            results = self.model([frame for _, frame in batch], conf=conf, verbose=False)
+            batch_ms = (time.perf_counter() - batch_start) * 1000
+            inference_time += batch_ms / 1000
+            for (name, _), result in zip(batch, results):
+                classes = result.boxes.cls.cpu().numpy().astype(int)
+                boxes = result.boxes.xywhn.cpu().numpy()
+                confidences = result.boxes.conf.cpu().numpy()
+                out.write(json.dumps({
+                    'image': name,
+                    'batch_ms': round(batch_ms, 3),
+                    'ms_per_image': round(batch_ms / len(batch), 3),
+                    'detections': [{'class': int(cls), 'name': self.class_names.get(int(cls), 'unknown'), 'conf': round(float(confidence), 4),
+                                    'xywhn': [round(float(v), 5) for v in box]} for cls, box, confidence in zip(classes, boxes, confidences)],
+                }) + '\n')
+                total += 1
+                label_path = find_label(name, label_dir) if os.path.isfile(name) else None
+                if label_path is not None:
+                    labelled += 1
+                    self._match(counts, classes, boxes, confidences, *_read_labels(label_path), iou_threshold)
+        
+        with open(output, 'w') as out:
+            batch = []
+            for name, frame in frames:
+                if frame is None:
+                    print(f"Skipping unreadable image {name}")
+                    continue
+                batch.append((name, frame))
+                if len(batch) == batch_size:
+                    run_batch(batch, out)
+                    batch = []
+            if batch:
+                run_batch(batch, out)
+        elapsed = time.perf_counter() - start
         
-        if not cap.isOpened():
-            raise RuntimeError(f"Could not open webcam at index {webcam_index}")
+        print(f"Evaluated {total} frames in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} fps, "
+              f"inference {inference_time / max(total, 1) * 1000:.1f} ms/frame at batch {batch_size})")
+        print(f"Detections written to {output}")
+        if labelled:
+            print(f"Against {labelled} label files (IoU >= {iou_threshold}):")
+            print(f"{'class':<8}{'precision':>10}{'recall':>8}{'tp':>6}{'fp':>6}{'fn':>6}")
+            for cls, (tp, fp, fn) in counts.items():
+                precision = tp / (tp + fp) if tp + fp else 0.0
+                recall = tp / (tp + fn) if tp + fn else 0.0
+                print(f"{self.class_names[cls]:<8}{precision:>10.3f}{recall:>8.3f}{tp:>6}{fp:>6}{fn:>6}")
+        return counts
+    
+    def test_live(self):
+        """Test the model with live webcam feed"""
+        source = CameraDiscovery().open()
         
         print("Testing model - Press 'q' to quit")
         
         try:
             while True:
-                ret, frame = cap.read()
+                ret, frame, _ = source.read()
                 if not ret:
                     continue
                 
@@ -60,9 +200,23 @@ class ModelTester:
                     break
                     
         finally:
-            cap.release()
+            source.release()
             cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    tester = ModelTester()
-    tester.test_live()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Test the dart model live on the webcam or offline on images/video")
+    parser.add_argument('command', nargs='?', default='live', choices=['live', 'evaluate'])
+    parser.add_argument('source', nargs='?', default='training_data', help="evaluate: image directory or video file")
+    parser.add_argument('--weights', default="runs/detect/dartboard_detection/weights/best.pt")
+    parser.add_argument('--output', default='evaluation.jsonl')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4, help="decode threads")
+    parser.add_argument('--labels', default=None, help="folder of YOLO label files, if not next to the images")
+    parser.add_argument('--conf', type=float, default=0.25)
+    args = parser.parse_args()
+    
+    tester = ModelTester(args.weights)
+    if args.command == 'evaluate':
+        tester.evaluate(args.source, args.output, args.batch_size, args.workers, label_dir=args.labels, conf=args.conf)
+    else:
+        tester.test_live()
\ No newline at end of file
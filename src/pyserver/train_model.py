@@ -1,15 +1,87 @@
 from ultralytics import YOLO
+import argparse
+import json
+import multiprocessing
+import time
+import cv2
+import numpy as np
 import yaml
 import os
+from dataset_prep import IMAGE_EXTENSIONS, prepare_dataset
+
+
+def _sweep_run(job):
+    """
+    Train (epochs > 0) or just evaluate one model/imgsz combination and return its mAP50.
+    Runs in a pool worker limited to `threads` torch threads, so parallel runs don't fight over cores.
+    """
+    model_name, img_size, yaml_path, epochs, batch_size, threads = job
+    import torch
+    torch.set_num_threads(threads)
+
+    weights = model_name
+    if epochs > 0:
+        name = f"sweep_{os.path.splitext(os.path.basename(model_name))[0]}_{img_size}"
+        results = YOLO(model_name).train(data=yaml_path, epochs=epochs, imgsz=img_size, batch=batch_size, name=name,
+                                         project='runs/sweep', exist_ok=True, cache='disk', plots=False, device='cpu',
+                                         workers=0, verbose=False)
+        weights = os.path.join(str(results.save_dir), 'weights', 'best.pt')
+    metrics = YOLO(weights).val(data=yaml_path, imgsz=img_size, batch=batch_size, device='cpu', plots=False, verbose=False)
+    return {'model': model_name, 'img_size': img_size, 'weights': weights, 'map50': float(metrics.box.map50), 'map': float(metrics.box.map)}
+
+
+def _build_label_caches(yaml_path):
+    """
+    Let ultralytics scan the labels and write its labels/<split>.cache files now, in one process.
+    Parallel sweep runs then only read them instead of all racing to write the same files.
+    """
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.data.utils import check_det_dataset
+    data = check_det_dataset(yaml_path)
+    for split in ('train', 'val', 'test'):
+        if data.get(split) and os.path.exists(data[split]):
+            YOLODataset(img_path=data[split], data=data, augment=False)
+
+
+def measure_latency(weights, img_size, images, threads, warmup=3):
+    """Single-frame CPU inference latency (pre/post-processing included) over `images`, in ms"""
+    import torch
+    torch.set_num_threads(threads)
+    model = YOLO(weights)
+    for _ in range(warmup):
+        model(images[0], imgsz=img_size, device='cpu', verbose=False)
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        model(image, imgsz=img_size, device='cpu', verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def pareto_front(runs):
+    """Runs that no other run beats on both latency and mAP50"""
+    return [run for run in runs
+            if not any(other['latency_p50_ms'] <= run['latency_p50_ms'] and other['map50'] >= run['map50']
+                       and (other['latency_p50_ms'] < run['latency_p50_ms'] or other['map50'] > run['map50']) for other in runs)]
 
 class DartboardTrainer:
-    def __init__(self, data_dir="training_data"):
+    def __init__(self, data_dir="training_data", cache_dir="dataset_cache", label_dir=None):
         self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.label_dir = label_dir  # YOLO label files, if they aren't next to the images
         
-    def create_dataset_yaml(self):
-        """Create dataset configuration file"""
+    def prepare_dataset(self, img_size=640, fractions=(0.8, 0.1, 0.1), workers=None):
+        """
+        Split the flat data_dir into train/val/test and pre-resize it to img_size in cache_dir
+        (see dataset_prep.py). Re-runs only process new or changed images.
+        """
+        return prepare_dataset(self.data_dir, self.cache_dir, img_size, fractions, self.label_dir, workers)
+    
+    def create_dataset_yaml(self, dataset_dir=None):
+        """Create dataset configuration file (for dataset_dir, by default data_dir)"""
+        dataset_dir = dataset_dir or self.data_dir
         dataset_config = {
-            'path': os.path.abspath(self.data_dir),
+            'path': os.path.abspath(dataset_dir),
             'train': 'images/train',
             'val': 'images/val',
             'test': 'images/test',
@@ -17,17 +89,24 @@ class DartboardTrainer:
             'names': ['20', '3', '11', '6', 'dart']
         }
         
-        yaml_path = os.path.join(self.data_dir, 'dataset.yaml')
+        yaml_path = os.path.join(dataset_dir, 'dataset.yaml')
         with open(yaml_path, 'w') as f:
             yaml.dump(dataset_config, f, default_flow_style=False)
         
         print(f"Created dataset config: {yaml_path}")
         return yaml_path
     
-    def train_model(self, epochs=100, img_size=640, batch_size=16):
-        """Train the YOLO model"""
+    def train_model(self, epochs=100, img_size=640, batch_size=16, prepared=False):
+        """
+        Train the YOLO model. With prepared=True the dataset is first brought up to date in
+        cache_dir and training reads the pre-resized images and their .npy arrays from there.
+        """
         # Create dataset config
-        yaml_path = self.create_dataset_yaml()
+        if prepared:
+            self.prepare_dataset(img_size)
+            yaml_path = self.create_dataset_yaml(self.cache_dir)
+        else:
+            yaml_path = self.create_dataset_yaml()
         
         # Load a pretrained YOLOv8 model (nano version for speed)
         model = YOLO('yolov8n.pt')
@@ -41,6 +120,7 @@ class DartboardTrainer:
             name='dartboard_detection',
             save=True,
             plots=True,
+            cache='disk' if prepared else False,  # load the prepared .npy arrays instead of decoding
             device='auto'  # Use GPU if available
         )
         
@@ -61,19 +141,88 @@ class DartboardTrainer:
         print(f"mAP50-95: {results.box.map}")
         
         return results
+    
+    def sweep(self, img_sizes=(320, 416, 512, 640), models=('yolov8n.pt', 'yolov8s.pt'), epochs=50, batch_size=8,
+              threads_per_run=2, latency_threads=None, latency_images=50, map_target=None, output='sweep_results.json'):
+        """
+        Train (or with epochs=0 only evaluate) every model x imgsz combination, then measure each
+        one's single-frame CPU latency on data_dir and print a latency-vs-mAP50 table with the
+        Pareto-optimal runs marked. Training runs are spread over the cores, `threads_per_run` torch
+        threads each; latency is measured afterwards one model at a time so runs don't skew each
+        other, with `latency_threads` threads (all cores by default). `models` are base weights to
+        fine-tune, or trained weights when epochs=0.
+        """
+        self.prepare_dataset(max(img_sizes))
+        yaml_path = self.create_dataset_yaml(self.cache_dir)
+        _build_label_caches(yaml_path)
+        
+        cores = os.cpu_count() or 1
+        threads_per_run = max(1, min(threads_per_run, cores))
+        jobs = [(model, img_size, yaml_path, epochs, batch_size, threads_per_run) for model in models for img_size in img_sizes]
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(max(1, min(len(jobs), cores // threads_per_run))) as pool:
+            runs = pool.map(_sweep_run, jobs, chunksize=1)
+        
+        paths = sorted(os.path.join(self.data_dir, name) for name in os.listdir(self.data_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+        images = [image for image in (cv2.imread(path) for path in paths[:latency_images]) if image is not None]
+        for run in runs:
+            run['latency_p50_ms'], run['latency_p95_ms'] = measure_latency(run['weights'], run['img_size'], images, latency_threads or cores)
+        
+        front = pareto_front(runs)
+        runs.sort(key=lambda run: run['latency_p50_ms'])
+        print(f"{'model':<16}{'imgsz':>6}{'mAP50':>8}{'mAP50-95':>10}{'p50 ms':>9}{'p95 ms':>9}  pareto")
+        for run in runs:
+            run['pareto'] = run in front
+            print(f"{os.path.basename(run['model']):<16}{run['img_size']:>6}{run['map50']:>8.3f}{run['map']:>10.3f}"
+                  f"{run['latency_p50_ms']:>9.1f}{run['latency_p95_ms']:>9.1f}  {'*' if run['pareto'] else ''}")
+        
+        if map_target is not None:
+            passing = [run for run in runs if run['map50'] >= map_target]
+            if passing:
+                best = passing[0] # runs are sorted by latency
+                print(f"Fastest run with mAP50 >= {map_target}: {best['weights']} at imgsz {best['img_size']} ({best['latency_p50_ms']:.1f} ms)")
+            else:
+                print(f"No run reached mAP50 {map_target}")
+        
+        if output:
+            with open(output, 'w') as f:
+                json.dump(runs, f, indent=2)
+            print(f"Sweep results written to {output}")
+        return runs
 
 if __name__ == "__main__":
-    trainer = DartboardTrainer("training_data")
-    
-    print("Starting training...")
-    print("Make sure your training_data folder has this structure:")
-    print("training_data/")
-    print("  images/")
-    print("    train/")
-    print("    val/")
-    print("  labels/")
-    print("    train/")
-    print("    val/")
+    parser = argparse.ArgumentParser(description="Prepare the dataset and train the dartboard model")
+    parser.add_argument('command', nargs='?', default='train', choices=['train', 'prepare', 'sweep'])
+    parser.add_argument('--data-dir', default='training_data')
+    parser.add_argument('--cache-dir', default='dataset_cache')
+    parser.add_argument('--img-size', type=int, default=640)
+    parser.add_argument('--labels', default=None, help="folder of YOLO label files, if not next to the images")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--prepared', action='store_true', help="train from the prepared cache instead of data_dir's images/ layout")
+    parser.add_argument('--img-sizes', type=int, nargs='+', default=[320, 416, 512, 640], help="sweep: input sizes")
+    parser.add_argument('--models', nargs='+', default=['yolov8n.pt', 'yolov8s.pt'], help="sweep: base weights, or trained weights with --epochs 0")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--threads-per-run', type=int, default=2, help="sweep: torch threads per parallel training run")
+    parser.add_argument('--map-target', type=float, default=None, help="sweep: report the fastest run reaching this mAP50")
+    args = parser.parse_args()
+    trainer = DartboardTrainer(args.data_dir, args.cache_dir, args.labels)
     
-    # Train the model
-    trainer.train_model(epochs=50, batch_size=8)  # Reduced for faster training
\ No newline at end of file
+    if args.command == 'prepare':
+        trainer.prepare_dataset(args.img_size, workers=args.workers)
+    elif args.command == 'sweep':
+        trainer.sweep(args.img_sizes, args.models, args.epochs, threads_per_run=args.threads_per_run, map_target=args.map_target)
+    elif args.prepared:
+        trainer.train_model(epochs=args.epochs, img_size=args.img_size, batch_size=8, prepared=True)
+    else:
+        print("Starting training...")
+        print("Make sure your training_data folder has this structure:")
+        print("training_data/")
+        print("  images/")
+        print("    train/")
+        print("    val/")
+        print("  labels/")
+        print("    train/")
+        print("    val/")
+        
+        # Train the model
+        trainer.train_model(epochs=args.epochs, img_size=args.img_size, batch_size=8)
\ No newline at end of file
@@ -1,47 +1,143 @@
-from ultralytics import YOLO
-from get_scores import GetScores
+from model_registry import registry
+from capture import CameraSource, MJPEGCameraSource, CaptureThread
+from camera_discovery import CameraDiscovery
+from calibration_tracker import CalibrationTracker
+from debug_sinks import DebugChannel, RawFeedSink, DetectionLogSink
+from dart_consensus import cluster_predictions, merge_into_visit, empty_frame_count
+from metrics import PipelineMetrics
 import cv2
 import numpy as np
 import time
-import platform
 
 class VideoProcessing:
-    def __init__(self, model_dir="weights.pt"):
-        self.model = YOLO(model_dir)
-        self.predict = GetScores(model_dir)
-    
-    def _debug_detections(self, result, calibration_coords):
-        """Debug function to print what YOLO is detecting"""
-        classes = result.boxes.cls
-        boxes = result.boxes.xywhn
-        conf = result.boxes.conf
-        
-        print(f"=== Frame Debug ===")
-        print(f"Total detections: {len(classes)}")
-        
-        class_names = {0: '20', 1: '3', 2: '11', 3: '6', 4: 'dart'}
-        
-        for i in range(len(classes)):
-            class_id = int(classes[i].item())
-            confidence = conf[i].item()
-            box = boxes[i]
-            class_name = class_names.get(class_id, 'unknown')
-            
-            print(f"  Detection {i}: Class={class_name} ({class_id}), Conf={confidence:.3f}, Box=[{box[0]:.3f}, {box[1]:.3f}]")
-        
-        # Show calibration status
-        valid_calibration_points = np.sum(np.all(calibration_coords != -1, axis=1))
-        print(f"Valid calibration points: {valid_calibration_points}/6")
-        
-        for i, coord in enumerate(calibration_coords):
-            point_names = ['20', '3', '11', '6', '9', '15']  # based on the indices
-            status = "FOUND" if not np.all(coord == -1) else "MISSING"
-            print(f"  {point_names[i]}: {status} - {coord}")
-        
-        print("==================")
+    def __init__(self, model_dir="weights.pt", model=None, predict=None, camera_index=None, backend='torch', int8=False, headless=False, debug_sinks=None, inference_mode='full', roi_size=None, motion_gate=None, calibration_tracker=None,
+                 queue_length=5, repeat_threshold=3, match_radius=0.01, tracker=None, clear_frames=2,
+                 on_event=None, metrics=None, score_lut=None, profiles=None, capture_mode='raw', imgsz=640):
+        """
+        model: optional model-like callable to use instead of loading model_dir, e.g. a shared
+        InferenceScheduler. Otherwise the model is fetched from the shared ModelRegistry the first
+        time it is needed (or by load_model()). predict: optional GetScores instance, by default
+        the registry's shared one, likewise fetched when first needed.
+        camera_index: webcam to open; when omitted the camera is found with CameraDiscovery (the
+        last working device if it is still plugged in, otherwise the first to answer a probe).
+        backend: 'torch', 'onnx' or 'openvino' (see inference_backend.py); int8 selects the
+        INT8-quantised export.
+        headless: production mode, no debug windows or console output on the hot path.
+        debug_sinks: optional list of DebugSink objects fed from a side channel. When omitted,
+        non-headless mode shows the raw feed and logs detections every 30 frames.
+        inference_mode: 'full' runs the model on the whole frame and remaps detections into the
+        square crop afterwards, 'roi' crops to the square board ROI before inference.
+        roi_size: in 'roi' mode, optionally downscale the crop to this many pixels square.
+        motion_gate: optional MotionGate; when set the model only runs on frames where the board
+        region changed, and the last detections are reused in between.
+        calibration_tracker: optional CalibrationTracker; when set the homography is locked once the
+        calibration points are stable instead of being solved every frame.
+        queue_length: number of frames of dart predictions kept for consensus voting.
+        repeat_threshold: number of frames in the queue a dart must appear in to be committed
+        (and empty frames needed to clear the board after a visit).
+        match_radius: board-plane distance under which two predictions count as the same dart.
+        tracker: optional DartTracker used instead of the pred_queue voting; darts are committed as
+        soon as their track is confirmed and the board counts as cleared after clear_frames
+        consecutive frames without detections.
+        on_event: optional callback receiving 'dart', 'bust', 'visit' and 'state' event dicts. It is called
+        from the thread running start(), so it must be thread-safe and must not block.
+        metrics: optional PipelineMetrics to record stage latencies and frame/dart counters into;
+        a private one is created otherwise. Recording is always on.
+        score_lut: optional ScoreLUT (see registry.get_score_lut) used to score board-plane darts
+        with a table lookup instead of GetScores.score.
+        profiles: optional ProfileStore. The homography is warm-started from the source's saved
+        calibration (when the frame size matches) so scoring starts on the first frame, and every
+        new lock is saved back. Implies a default CalibrationTracker if none is given.
+        capture_mode: 'raw' opens the webcam in the driver's default format and converts each frame
+        to RGB, 'mjpeg' asks for MJPEG and decodes each frame straight to RGB, scaled down to what
+        the model needs (see MJPEGCameraSource).
+        imgsz: model input size, the smallest the 'mjpeg' decode may shrink the board to.
+        """
+        if inference_mode not in ('full', 'roi'):
+            raise ValueError(f"Unknown inference mode: {inference_mode}")
+        if capture_mode not in ('raw', 'mjpeg'):
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        self.model_dir = model_dir
+        self.backend = backend
+        self.int8 = int8
+        self._model = model
+        self._predict = predict
+        self.camera_index = camera_index
+        self.headless = headless
+        self.inference_mode = inference_mode
+        self.roi_size = roi_size
+        self.capture_mode = capture_mode
+        self.imgsz = imgsz
+        self.motion_gate = motion_gate
+        self.calibration_tracker = calibration_tracker
+        self.queue_length = queue_length
+        self.repeat_threshold = repeat_threshold
+        self.match_radius = match_radius
+        self.tracker = tracker
+        self.clear_frames = clear_frames
+        self.on_event = on_event
+        self.score_lut = score_lut
+        self.profiles = profiles
+        if profiles is not None and calibration_tracker is None:
+            calibration_tracker = self.calibration_tracker = CalibrationTracker()
+        if calibration_tracker is not None and calibration_tracker.on_event is None:
+            calibration_tracker.on_event = lambda kind, info: self.debug_channel.publish('calibration', event=kind, **info)
+        if debug_sinks is None:
+            debug_sinks = [] if headless else [RawFeedSink(on_quit=self.stop), DetectionLogSink(every=30)]
+        self.debug_channel = DebugChannel(debug_sinks)
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.metrics.add_corrections_source(lambda: getattr(self, 'num_corrections', 0))
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = registry.get(self.model_dir, self.backend, self.int8, self.imgsz)
+        return self._model
+
+    @property
+    def predict(self):
+        if self._predict is None:
+            self._predict = registry.get_scores(self.model_dir)
+        return self._predict
+
+    def load_model(self):
+        """Load and warm up the model (and GetScores) now rather than on the first frame"""
+        model = self.model
+        self.predict # property access builds the shared GetScores
+        return model
+
+    def stop(self):
+        self.game_over = True
+
+    def _emit(self, kind, **data):
+        if self.on_event is not None:
+            self.on_event({'type': kind, 'ts': time.time(), 'frame': self.frames_processed, **data})
+
+    def _emit_visit_changes(self, remaining):
+        """
+        Emit dart events for darts that appeared or changed since the last frame, a bust event once
+        per visit, and a state event whenever the scoreboard state changes
+        """
+        darts = [dart for dart in self.darts_in_visit if dart != '']
+        for index, dart in enumerate(darts):
+            if index >= len(self.reported_darts) or self.reported_darts[index] != dart:
+                self._emit('dart', player=self.scorer.current_player, index=index, segment=dart, value=self.scorer.get_score_for_dart(dart))
+        self.reported_darts = darts
+
+        if remaining == 'BUST' and not self.reported_bust:
+            self._emit('bust', player=self.scorer.current_player, darts=darts)
+        self.reported_bust = remaining == 'BUST'
 
-    def _distance(self, coord1, coord2):
-        return np.sqrt(np.sum((coord1 - coord2) ** 2))
+        # scoreboard state, only sent when it changes
+        state = {
+            'scores': [int(score) for score in self.scorer.scores],
+            'current_player': int(self.scorer.current_player),
+            'darts_in_visit': darts,
+            'remaining': remaining if isinstance(remaining, str) else int(remaining),
+        }
+        if state != self.reported_state:
+            self.reported_state = state
+            self._emit('state', state=state)
 
     def _assess_visit(self, darts):
         darts = [dart for dart in darts if dart != '']
@@ -57,19 +153,30 @@ class VideoProcessing:
 
             self.wait_for_dart_removal = True
 
-        if (remaining == 0 and darts[-1][0] != 'D') or remaining == 1 or remaining < 0:
+        if self.scorer.is_bust(darts, remaining):
             remaining = 'BUST'
         
         return score, remaining
 
 
     def _commit_score(self):
-        self.scorer.commit_score([dart for dart in self.darts_in_visit if dart != ''])
+        darts = [dart for dart in self.darts_in_visit if dart != '']
+        player = self.scorer.current_player
+        score, bust = self.scorer.commit_score(darts)
+        self.metrics.visits.inc()
+        self.metrics.darts_committed.inc(len(darts))
+        if bust:
+            self.metrics.busts.inc()
+        self._emit('visit', player=player, darts=darts, score=score, bust=bust, scores=list(self.scorer.scores), next_player=self.scorer.current_player)
+        self.reported_darts, self.reported_bust = [], False
         self.dart_coords_in_visit, self.darts_in_visit = [], ['']*3
         self.user_calibration = -np.ones((6, 2))
         self.wait_for_dart_removal = False
-        self.pred_queue = -np.ones((5,3,2))
+        self.pred_queue = -np.ones((self.queue_length,3,2))
         self.pred_queue_count = 0
+        if self.tracker is not None:
+            self.tracker.reset()
+            self.visit_track_ids = set()
 
 
     def _adjust_coords(self, calibration_coords, dart_coords, resolution, crop_start, crop_size):
@@ -85,164 +192,275 @@ class VideoProcessing:
         
         return calibration_coords, dart_coords
 
+    def _crop_roi(self, frame):
+        """Cut the centred square board ROI out of the frame, downscaled to roi_size if set"""
+        h, w = frame.shape[:2]
+        size = min(h, w)
+        y0, x0 = (h - size) // 2, (w - size) // 2
+        roi = frame[y0:y0 + size, x0:x0 + size]
+        if self.roi_size is not None and self.roi_size < size:
+            roi = cv2.resize(roi, (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+        return roi
+
+    def _infer(self, frame_rgb):
+        if self.inference_mode == 'roi':
+            frame_rgb = self._crop_roi(frame_rgb)
+        return self.model(frame_rgb, verbose=not self.headless)
+
+    def _to_crop_coords(self, calibration_coords, dart_coords, resolution, crop_start, crop_size):
+        if self.inference_mode == 'roi':
+            return calibration_coords, dart_coords # detections are already normalised to the square crop
+        return self._adjust_coords(calibration_coords, dart_coords, resolution, crop_start, crop_size)
+
+    def _save_calibration_profile(self, identity, H_matrix, resolution, crop_start, crop_size):
+        tracker = self.calibration_tracker
+        self.profiles.update(identity, calibration={
+            'calibration_coords': tracker.reference_coords.tolist(),
+            'valid': tracker.reference_valid.tolist(),
+            'homography': np.asarray(H_matrix[0]).tolist(),
+            'resolution': [int(size) for size in resolution],
+            'crop_start': crop_start.tolist(),
+            'crop_size': float(crop_size),
+        })
+
+    def _process_tracks(self, transformed_dart_coords):
+        self.tracker.update(transformed_dart_coords)
+
+        if self.wait_for_dart_removal:
+            if self.tracker.empty_frames >= self.clear_frames:
+                self._commit_score()
+
+        elif self.darts_in_visit.count('') > 0:
+            new_tracks = [track for track in self.tracker.confirmed_tracks() if track.id not in self.visit_track_ids]
+            if new_tracks:
+                self.dart_coords_in_visit = merge_into_visit(self.dart_coords_in_visit, [track.position.copy() for track in new_tracks], self.match_radius)
+                self.visit_track_ids.update(track.id for track in new_tracks)
+
     def _process_predictions(self, transformed_dart_coords, repeat_threshold):
-        if len(transformed_dart_coords) == 0:
-            self.pred_queue[self.pred_queue_count % 5] = -np.ones((3, 2))
-        else:
-            self.pred_queue[self.pred_queue_count % 5] = np.vstack((transformed_dart_coords, -np.ones((3-len(transformed_dart_coords), 2)))) # add [-1, -1] to fill any spaces when < 3 darts
+        if self.tracker is not None:
+            self.pred_queue_count += 1
+            return self._process_tracks(transformed_dart_coords)
+
+        frame_preds = -np.ones((3, 2)) # [-1, -1] fills any spaces when < 3 darts
+        if len(transformed_dart_coords) > 0:
+            frame_preds[:min(3, len(transformed_dart_coords))] = transformed_dart_coords[:3]
+        self.pred_queue[self.pred_queue_count % self.queue_length] = frame_preds
         self.pred_queue_count += 1
 
         if self.wait_for_dart_removal:
-            count = 0
-            for frame in self.pred_queue:
-                if np.all(frame == -1):
-                    count += 1
-            if count >= repeat_threshold:
+            if empty_frame_count(self.pred_queue) >= repeat_threshold:
                 self._commit_score()
         
         elif self.darts_in_visit.count('') > 0:
             # check based on number of darts in visit and if the dart has been scored before
-            unique_predictions = np.unique(self.pred_queue[self.pred_queue != -1].reshape(-1,2), axis=0)
-            matches = {tuple(pred): [] for pred in unique_predictions} # for grouping together all similar predictions
-            
-            for frame in self.pred_queue:
-                for pred in frame:
-                    if np.any(pred == -1):
-                        continue
-                    for unique_pred in unique_predictions:
-                        if self._distance(pred, unique_pred) < 0.01: # assume same prediction if distance < 0.01
-                            matches[tuple(unique_pred)].append(pred)
-                            break
-            # sort dictionary based on length of values lists
-            matches = {k: v for k, v in sorted(matches.items(), key=lambda item: len(item[1]), reverse=True) if len(v) >= repeat_threshold}
-            best_predictions = []
-            for _, match_ in matches.items():
-                best_predictions.append(np.mean(match_, axis=0))
-            
-            if len(self.dart_coords_in_visit) == 0:
-                self.dart_coords_in_visit = [pred for pred in best_predictions[:3]]
-            
-            else:
-                for best_pred in best_predictions:
-                    if all([self._distance(coords, best_pred) > 0.01 for coords in self.dart_coords_in_visit]):
-                        if len(self.dart_coords_in_visit) == 3:
-                            break
-                        self.dart_coords_in_visit.append(best_pred)
+            best_predictions = cluster_predictions(self.pred_queue, self.match_radius, repeat_threshold)
+            self.dart_coords_in_visit = merge_into_visit(self.dart_coords_in_visit, best_predictions, self.match_radius)
 
 
-    def _get_webcam_index(self):
-        """
-        Find the first available webcam index that works on both Windows and Linux
-        """
-        # Try common webcam indices
-        for index in range(5):
-            cap = cv2.VideoCapture(index)
-            if cap.isOpened():
-                # Test if we can read a frame
-                ret, _ = cap.read()
-                cap.release()
-                if ret:
-                    return index
-        
-        # If no webcam found, return 0 as default
-        return 0
+    def _camera_source(self, index, resolution, stable_id=None):
+        if self.capture_mode == 'raw':
+            return CameraSource(index, resolution, stable_id=stable_id)
+        # 'full' letterboxes the long side to imgsz; 'roi' crops a square the size of the short side
+        if self.inference_mode == 'roi':
+            return MJPEGCameraSource(index, resolution, stable_id=stable_id, min_short_side=self.roi_size or self.imgsz)
+        return MJPEGCameraSource(index, resolution, stable_id=stable_id, min_long_side=self.imgsz)
+
+    def _open_default_camera(self, resolution):
+        """Open camera_index, or the discovered webcam (re-discovering once if the cached one doesn't work)"""
+        if self.camera_index is not None:
+            return self._camera_source(self.camera_index, resolution).open()
+        return CameraDiscovery().open(lambda device: self._camera_source(device.index, resolution, device.stable_id))
 
-    def start(self, GUI, scorer, resolution:np.array):
+    def _reset_game_state(self, scorer):
         self.scorer = scorer
         self.num_corrections = 0
-        
-        crop_size=min(resolution)
-        crop_start = resolution/2 - crop_size/2
+        self.frames_processed = 0
+        self.frame_timestamp = None
 
         self.dart_coords_in_visit, self.darts_in_visit = [], ['']*3
         self.user_calibration = -np.ones((6, 2))
         self.wait_for_dart_removal = False
         self.game_over = False
+        self.reported_darts, self.reported_bust = [], False # what has been sent through on_event this visit
+        self.reported_state = None
 
-        self.pred_queue = -np.ones((5,3,2)) # implement FIFO queue to store the last 5 frames' predictions
+        self.pred_queue = -np.ones((self.queue_length,3,2)) # implement FIFO queue to store the last queue_length frames' predictions
         self.pred_queue_count = 0
-        repeat_threshold = 3 # threshold number of frames to commit a dart
+        if self.tracker is not None:
+            self.tracker.reset()
+            self.visit_track_ids = set() # tracks already turned into darts this visit
+
+    def _update_visit(self, transformed_dart_coords):
+        """Feed one frame of board-plane dart coords through the commit logic and score the visit"""
+        with self.metrics.stage('_process_predictions'):
+            self._process_predictions(transformed_dart_coords, self.repeat_threshold)
+        
+        score_darts = self.score_lut.score if self.score_lut is not None else self.predict.score
+        with self.metrics.stage('score'):
+            self.darts_in_visit, score = score_darts(np.array(self.dart_coords_in_visit)) # must always run this in case user moves coords
+        while len(self.darts_in_visit) < 3:
+            self.darts_in_visit.append('')
+        
+        score, remaining = self._assess_visit(self.darts_in_visit)
+        if self.on_event is not None:
+            self._emit_visit_changes(remaining)
+        return score, remaining
+
+    def start(self, GUI, scorer, resolution:np.array=None, source=None):
+        """
+        Run the scoring loop until stop() is called or a recorded source runs out.
+        source: a FrameSource; by default the webcam (camera_index or the first working one) opened
+        at `resolution` (height, width). Live sources are read through a latest-frame buffer, recorded
+        sources frame by frame as fast as the pipeline allows (unless they pace themselves).
+        """
+        self._reset_game_state(scorer)
 
         prev_frame_time = 0
         new_frame_time = 0
 
-        # Setup webcam capture
-        webcam_index = self._get_webcam_index()
-        
-        # On Windows, create VideoCapture with DirectShow backend for better compatibility
-        if platform.system() == "Windows":
-            cap = cv2.VideoCapture(webcam_index, cv2.CAP_DSHOW)
+        if source is None:
+            source = self._open_default_camera(resolution)
         else:
-            cap = cv2.VideoCapture(webcam_index)
-        
-        # Set webcam properties for better performance
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(resolution[1]))  # width
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(resolution[0]))  # height
-        cap.set(cv2.CAP_PROP_FPS, 30)
-        
-        if not cap.isOpened():
-            raise RuntimeError(f"Could not open webcam at index {webcam_index}")
+            source.open()
+
+        # Live capture runs in its own thread so inference always works on the newest frame
+        # rather than one that queued up in the driver while the previous frame was processed
+        capture = None
+        if source.live:
+            capture = CaptureThread(source)
+            capture.start()
+        self.frames_dropped = 0
+        self.debug_channel.start()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.calibration_tracker is not None:
+            self.calibration_tracker.reset()
+        last_detection = None # (result, calibration_coords, dart_coords) from the last inference
+        last_frame_id = 0
+        metrics = self.metrics
+        saved_calibration = self.profiles.get(source.identity, 'calibration') if self.profiles is not None else None
+        saved_reference = None # reference coords of the lock last written to the profile
 
         try:
             while True:
                 if self.game_over:
                     break
                 
-                ret, frame = cap.read()
-                if not ret:
-                    print("Failed to read frame from webcam")
-                    continue
+                if capture is not None:
+                    frame, timestamp, frame_id = capture.buffer.get(timeout=1.0)
+                    if frame is None:
+                        if capture.buffer.closed:
+                            raise RuntimeError("Capture thread stopped unexpectedly")
+                        if not self.headless:
+                            print("Failed to read frame from webcam")
+                        continue
+                    self.frames_dropped = capture.buffer.frames_dropped
+                    # every id skipped since the last frame we got was overwritten unprocessed
+                    metrics.frames_captured.inc(frame_id - last_frame_id)
+                    metrics.frames_dropped.inc(frame_id - last_frame_id - 1)
+                    last_frame_id = frame_id
+                else:
+                    ret, frame, timestamp = source.read()
+                    if not ret:
+                        if source.exhausted:
+                            break
+                        continue
+                    metrics.frames_captured.inc()
+                frame_start = time.perf_counter()
+                self.frames_processed += 1
+                metrics.frames_processed.inc()
+                self.frame_timestamp = timestamp
                 
-                # Debug: Show raw camera feed (comment out when not debugging)
-                cv2.imshow('Raw Camera Feed', frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    self.game_over = True
-                    break
+                resolution = np.array(frame.shape[:2], dtype=np.float64)
+                crop_size = min(resolution)
+                crop_start = resolution/2 - crop_size/2
+                
+                # Warm-start from the saved profile once the frame size is known; live detections then validate it
+                if saved_calibration is not None:
+                    if saved_calibration['resolution'] == [int(size) for size in resolution]:
+                        self.calibration_tracker.warm_start(np.array(saved_calibration['calibration_coords']), saved_calibration['valid'],
+                                                            lambda coords: self.predict.find_homography(coords, crop_size))
+                    saved_calibration = None
                 
-                # Convert frame to RGB (OpenCV uses BGR by default)
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if self.debug_channel.wants('frame'):
+                    self.debug_channel.publish('frame', frame=cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) if source.rgb else frame)
+                self.debug_channel.pump_gui() # HighGUI windows are drawn on this thread only, like the GUI
                 
-                # Run YOLO inference on the frame
-                results = self.model(frame_rgb, verbose=True)
+                # Only run the model when the board region has changed (or the keep-alive has expired)
+                run_inference = self.motion_gate is None or self.motion_gate.should_infer(frame, timestamp) or last_detection is None
                 
-                for result in results:
-                    calibration_coords, dart_coords = self.predict.process_yolo_output(result)
+                if run_inference:
+                    # Convert frame to RGB (OpenCV uses BGR by default), unless the source already decoded to RGB
+                    if source.rgb:
+                        frame_rgb = frame
+                    else:
+                        with metrics.stage('cvtColor'):
+                            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                     
-                    # Debug: Print what we're detecting every 30 frames (1 second at 30 FPS)
-                    if self.pred_queue_count % 30 == 0:
-                        self._debug_detections(result, calibration_coords)
+                    # Run YOLO inference on the frame (or on the square ROI in 'roi' mode)
+                    with metrics.stage('yolo'):
+                        result = self._infer(frame_rgb)[0]
+                    with metrics.stage('process_yolo_output'):
+                        calibration_coords, dart_coords = self.predict.process_yolo_output(result)
+                    last_detection = (result, calibration_coords.copy(), dart_coords.copy())
                     
-                    if np.count_nonzero(calibration_coords == -1)/2 > 2:
-                        continue
-                    calibration_coords, dart_coords = self._adjust_coords(calibration_coords, dart_coords, resolution, crop_start, crop_size)
-                    calibration_coords = np.where(self.user_calibration == -1, calibration_coords, self.user_calibration)
+                    if self.debug_channel.wants('detections', self.pred_queue_count):
+                        self.debug_channel.publish('detections', result=result, calibration_coords=calibration_coords.copy(), frame_index=self.pred_queue_count)
+                else:
+                    # Board unchanged: feed the last detections through again so the commit logic keeps counting frames
+                    metrics.frames_gated.inc()
+                    result, calibration_coords, dart_coords = last_detection[0], last_detection[1].copy(), last_detection[2].copy()
+                
+                if np.count_nonzero(calibration_coords == -1)/2 > 2:
+                    metrics.calibration_failures.inc()
+                    continue
+                valid_calibration = np.all(calibration_coords != -1, axis=1) | np.all(self.user_calibration != -1, axis=1)
+                with metrics.stage('_adjust_coords'):
+                    calibration_coords, dart_coords = self._to_crop_coords(calibration_coords, dart_coords, resolution, crop_start, crop_size)
+                calibration_coords = np.where(self.user_calibration == -1, calibration_coords, self.user_calibration)
 
-                    H_matrix = self.predict.find_homography(calibration_coords, crop_size)
+                with metrics.stage('find_homography'):
+                    if self.calibration_tracker is None:
+                        H_matrix = self.predict.find_homography(calibration_coords, crop_size)
+                    else:
+                        H_matrix = self.calibration_tracker.update(calibration_coords, valid_calibration, self.user_calibration,
+                                                                   lambda coords: self.predict.find_homography(coords, crop_size))
+                        if (self.profiles is not None and self.calibration_tracker.locked and not self.calibration_tracker.warm_started
+                                and self.calibration_tracker.reference_coords is not saved_reference):
+                            saved_reference = self.calibration_tracker.reference_coords
+                            self._save_calibration_profile(source.identity, H_matrix, resolution, crop_start, crop_size)
+                with metrics.stage('transform_to_boardplane'):
                     transformed_dart_coords = self.predict.transform_to_boardplane(H_matrix[0], dart_coords, crop_size)
-                    
-                    self._process_predictions(transformed_dart_coords, repeat_threshold)
-                    
-                    self.darts_in_visit, score = self.predict.score(np.array(self.dart_coords_in_visit)) # must always run this in case user moves coords
-                    while len(self.darts_in_visit) < 3:
-                        self.darts_in_visit.append('')
-                    
-                    score, remaining = self._assess_visit(self.darts_in_visit)
+                
+                score, remaining = self._update_visit(transformed_dart_coords)
+                metrics.stages['frame'].observe(time.perf_counter() - frame_start)
 
-                    new_frame_time = time.time()
-                    fps = round(1/(new_frame_time - prev_frame_time), 1)
-                    prev_frame_time = new_frame_time
-                    
-                    GUI._display_graphics(result, H_matrix, crop_start, crop_size, calibration_coords, dart_coords, score, remaining, fps)
-                    
-                    # Break after processing first result to maintain single frame processing
-                    break
+                new_frame_time = time.time()
+                fps = round(1/(new_frame_time - prev_frame_time), 1)
+                prev_frame_time = new_frame_time
+                
+                if GUI is not None:
+                    if self.inference_mode == 'roi': # result image is the crop itself
+                        GUI._display_graphics(result, H_matrix, np.zeros(2), min(result.orig_shape), calibration_coords, dart_coords, score, remaining, fps)
+                    else:
+                        GUI._display_graphics(result, H_matrix, crop_start, crop_size, calibration_coords, dart_coords, score, remaining, fps)
 
         finally:
-            cap.release()
-            cv2.destroyAllWindows()  # Clean up debug windows
+            if capture is not None:
+                capture.stop() # the capture thread releases the source once its last read() returns
+            else:
+                source.release()
+            self.debug_channel.stop()
+            if self.profiles is not None:
+                self.profiles.flush()
+            if not self.headless:
+                cv2.destroyAllWindows()  # Clean up debug windows
 
-        print(f'Number of user corrections: {self.num_corrections}')
-        print(f'Number of darts thrown: {np.sum(self.scorer.num_dart_history)}')
+        if not self.headless:
+            print(f'Number of user corrections: {self.num_corrections}')
+            if capture is not None:
+                print(f'Number of frames dropped: {capture.buffer.frames_dropped}/{capture.buffer.frames_written}')
+            print(f'Number of darts thrown: {np.sum(self.scorer.num_dart_history)}')
 
 if __name__ == "__main__":
     pass
\ No newline at end of file